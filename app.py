@@ -8,8 +8,8 @@ ZUGSPIEL – STREAMLIT APP
 Szenario 1 (Querschnitt-Modell):
     Funktion: simulate_one_round_s1(...)
     -> "Fight result" Bereich:
-       - p_hit_player / p_hit_enemy
        - kills_on_enemy / kills_on_player
+         (p_hit_player / p_hit_enemy in kernels.fight, MODE_CROSS_SECTION)
        - Anwenden der Verluste + Spielende
 
 Szenario 2 (Konstante Trefferchance pro Schuss):
@@ -23,33 +23,51 @@ Szenario 3 (Armee-Auswahl + Firepower):
     -> "Fight result" Bereich:
        - kills_on_enemy / kills_on_player (je Soldat firepower Schüsse pro Runde)
        - Anwenden der Verluste + Spielende
+
+Szenario 3 im Detail-Modus (Veteranen/Rekruten, jeder Soldat einzeln):
+    Funktion: simulate_one_round_s3_detailed(...)
+    -> Kampf selbst in soldiers.resolve_round(...)
 """
 
 import time
 import random
-import base64
-from pathlib import Path
+import secrets
+
+import altair as alt
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+import assets
+import config
+import kernels
+import policies
+import snapshot
+import soldiers
+from config import (
+    N_PLAYER_START,
+    M_ENEMY_START,
+    S3_ENEMY_SOLDIERS,
+    S3_ENEMY_FIREPOWER,
+    HIT_CHANCE_S2,
+    CROSS_SECTION_N_S1,
+    S3_ARMIES,
+    S3_SOLDIER_PROFILES,
+    S3_ENEMY_VETERANS,
+)
+
 # ============================================================
-# KONFIG
+# KONFIG (Spielregeln: config.py)
 # ============================================================
-N_PLAYER_START = 50
-M_ENEMY_START = 30
-
-# Szenario 3: Gegner-Setup (konfigurierbar)
-S3_ENEMY_SOLDIERS = 45
-S3_ENEMY_FIREPOWER = 2
-
-# Szenario 2: konstante Trefferchance pro Schuss
-HIT_CHANCE_S2 = 0.10
-
-# Szenario 1: Querschnitt n, Trefferchance pro Schütze = exposed / n
-CROSS_SECTION_N_S1 = 40
-
 TICK_SECONDS = 0.1
 MAX_LOG_LINES = 200
 
+# Erklärung: Monte-Carlo-Verläufe (Anzahl simulierter Matches, Runden im Chart)
+MC_TRAJECTORIES = 5000
+MC_MIN_ROUNDS = 40      # Chart zeigt mindestens so viele Runden ...
+MC_ROUND_LIMIT = 500    # ... und so viele, wie die Gefechte dauern (höchstens das)
+MC_PERCENTILES = [5, 25, 50, 75, 95]
+
 # Freischaltung Erklärung nach X SPIELEN (pro Szenario separat)
 UNLOCK_EXPLANATION_AFTER_GAMES = 5
 
@@ -70,45 +88,23 @@ BACKGROUND_FILES_S3 = [
     "szenario3_1.png",
 ]
 
-# Szenario 3: Armeen (3 Optionen)
-S3_ARMIES = [
-    {
-        "key": "Sturmtrupp",
-        "soldiers": 35,
-        "firepower": 3,
-        "desc": "Aggressiv, hohe Feuerkraft, weniger Mannstärke.",
-    },
-    {
-        "key": "Infanterie",
-        "soldiers": 50,
-        "firepower": 2,
-        "desc": "Ausgewogen: solide Mannstärke und Feuerkraft.",
-    },
-    {
-        "key": "Miliz",
-        "soldiers": 70,
-        "firepower": 1,
-        "desc": "Viele Soldaten, aber geringe Feuerkraft.",
-    },
-]
-
 st.set_page_config(page_title="Zugspiel", layout="wide")
 
 
 # ============================================================
 # UI: Background + Styles (base64, cached)
 # ============================================================
-@st.cache_data(show_spinner=False)
-def _b64_of_image(path: str) -> str:
-    p = Path(path)
-    if not p.exists():
-        return ""
-    return base64.b64encode(p.read_bytes()).decode()
+@st.cache_resource(show_spinner=False)
+def asset_manager() -> assets.AssetManager:
+    # einmal pro Prozess: alle Hintergründe scannen und prüfen
+    return assets.AssetManager(
+        [START_BACKGROUND, *BACKGROUND_FILES_S1, *BACKGROUND_FILES_S2, *BACKGROUND_FILES_S3]
+    )
 
 
 def set_background_and_ui(image_path: str):
-    encoded = _b64_of_image(image_path)
-    if not encoded:
+    data_uri = asset_manager().data_uri(image_path, st.session_state.viewport)
+    if not data_uri:
         st.markdown(
             """
             <style>
@@ -123,7 +119,7 @@ def set_background_and_ui(image_path: str):
         f"""
         <style>
         .stApp {{
-            background-image: url("data:image/png;base64,{encoded}");
+            background-image: url("{data_uri}");
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
@@ -201,6 +197,7 @@ def deine_schuetzen_phrase(n: int) -> str:
 
 def append_log(line: str):
     st.session_state.log.append(line)
+    st.session_state.log_seq += 1  # fortlaufende Nummer, damit Snapshots nur neue Zeilen schreiben
     if len(st.session_state.log) > MAX_LOG_LINES:
         st.session_state.log = st.session_state.log[-MAX_LOG_LINES:]
 
@@ -213,10 +210,100 @@ def available_backgrounds_for(scenario: str) -> list[str]:
     else:
         files = BACKGROUND_FILES_S3
 
-    avail = [f for f in files if Path(f).exists()]
+    avail = asset_manager().available(files)
     return avail if avail else files
 
 
+def enemy_policy(enemy_behaviour: str, match_cfg: kernels.MatchConfig):
+    """Gegner-Tabelle; None (= alle schießen), wenn für diese Armeegrößen keine passt."""
+    if not policies.supported(match_cfg):
+        return None
+    return policies.table_for(enemy_behaviour, match_cfg)
+
+
+def match_config_for(scenario: str, shooters_target: int) -> kernels.MatchConfig:
+    """Zähler-Modell des aktuellen Szenarios (Spieler hält shooters_target im Feuer)."""
+    army = {
+        "soldiers": st.session_state.s3_army_soldiers,
+        "firepower": st.session_state.s3_army_firepower,
+    }
+    return config.match_config(scenario, shooters_target, army)
+
+
+# ============================================================
+# Erklärung: Monte-Carlo-Verläufe
+# ============================================================
+@st.cache_data(show_spinner=False, max_entries=64)
+def trajectory_bands(match_cfg: kernels.MatchConfig, enemy_behaviour: str,
+                     n_matches: int) -> tuple[pd.DataFrame, float]:
+    """Perzentil-Bänder der Truppenstärke pro Runde (gecacht je Szenario-Parameter, für alle Sessions).
+
+    Die Rundenzahl ergibt sich aus den Verläufen selbst (vorsichtige Gegner ziehen
+    Gefechte deutlich in die Länge): solange Gefechte offen sind und sich noch etwas
+    tut, wird mit doppelt so vielen Runden neu simuliert.
+    Rückgabe: (Bänder, Anteil der Gefechte, die am Ende des Charts noch offen sind).
+    """
+    table = enemy_policy(enemy_behaviour, match_cfg)
+    rounds = MC_MIN_ROUNDS
+    while True:
+        player_traj, enemy_traj = kernels.simulate_trajectories(match_cfg, n_matches, rounds, table)
+        changed = (np.diff(player_traj, axis=1) != 0).any(axis=0) | (np.diff(enemy_traj, axis=1) != 0).any(axis=0)
+        still_open = (player_traj[:, -1] > 0) & (enemy_traj[:, -1] > 0)
+        # offene Gefechte, in denen seit der halben Zeit nichts passiert ist, hängen fest
+        if rounds >= MC_ROUND_LIMIT or not still_open.any() or not changed[rounds // 2 :].any():
+            break
+        rounds = min(2 * rounds, MC_ROUND_LIMIT)
+
+    last = int(np.flatnonzero(changed)[-1]) + 1 if changed.any() else 0
+    rounds = max(MC_MIN_ROUNDS, last)
+    player_traj, enemy_traj = player_traj[:, : rounds + 1], enemy_traj[:, : rounds + 1]
+    open_share = float(((player_traj[:, -1] > 0) & (enemy_traj[:, -1] > 0)).mean())
+
+    frames = []
+    for side, traj in (("Dein Zug", player_traj), ("Feind", enemy_traj)):
+        bands = np.percentile(traj, MC_PERCENTILES, axis=0)
+        frame = pd.DataFrame({f"p{q}": bands[i] for i, q in enumerate(MC_PERCENTILES)})
+        frame["runde"] = np.arange(rounds + 1)
+        frame["seite"] = side
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True), open_share
+
+
+def render_trajectory_chart(scenario: str):
+    st.markdown("### Viele Gefechte auf einen Blick")
+    player_start = match_config_for(scenario, 0).player_start
+    target = st.slider(
+        "Wie viele deiner Soldaten erwidern das Feuer? (fest für alle simulierten Gefechte)",
+        min_value=0,
+        max_value=player_start,
+        value=player_start,
+        key=f"mc_target_{scenario}",
+    )
+    bands, open_share = trajectory_bands(
+        match_config_for(scenario, target),
+        st.session_state.enemy_behaviour,
+        MC_TRAJECTORIES,
+    )
+
+    base = alt.Chart(bands).encode(
+        x=alt.X("runde:Q", title="Runde"),
+        color=alt.Color("seite:N", title=None),
+    )
+    chart = (
+        base.mark_area(opacity=0.15).encode(y=alt.Y("p5:Q", title="Soldaten"), y2="p95:Q")
+        + base.mark_area(opacity=0.3).encode(y="p25:Q", y2="p75:Q")
+        + base.mark_line(strokeWidth=2.5).encode(y="p50:Q")
+    )
+    st.altair_chart(chart, use_container_width=True)
+    caption = (
+        f"{MC_TRAJECTORIES} simulierte Gefechte: Linie = Median, "
+        "dunkles Band = 25–75 %, helles Band = 5–95 % der Verläufe."
+    )
+    if open_share > 0:
+        caption += f" {open_share:.0%} der Gefechte sind am Ende der Grafik noch nicht entschieden."
+    st.caption(caption)
+
+
 # ============================================================
 # State Init
 # ============================================================
@@ -245,9 +332,18 @@ def ensure_globals():
         st.session_state.player_name = "Dein Zug"
     if "enemy_name" not in st.session_state:
         st.session_state.enemy_name = "Feind"
+    if "enemy_behaviour" not in st.session_state:
+        st.session_state.enemy_behaviour = policies.DEFAULT_BEHAVIOUR
+    if "enemy_cover" not in st.session_state:
+        st.session_state.enemy_cover = 0
 
     if "bg_file" not in st.session_state:
         st.session_state.bg_file = START_BACKGROUND
+    if "viewport" not in st.session_state:
+        st.session_state.viewport = assets.DEFAULT_VIEWPORT
+
+    if "log_seq" not in st.session_state:
+        st.session_state.log_seq = 0
 
     # Szenario 3: Army Selection
     if "s3_army_key" not in st.session_state:
@@ -256,6 +352,10 @@ def ensure_globals():
         st.session_state.s3_army_soldiers = None
     if "s3_army_firepower" not in st.session_state:
         st.session_state.s3_army_firepower = None
+    if "s3_army_veterans" not in st.session_state:
+        st.session_state.s3_army_veterans = 0.0
+    if "s3_detailed" not in st.session_state:
+        st.session_state.s3_detailed = False
 
 
 def init_match_for(scenario: str):
@@ -284,8 +384,24 @@ def init_match_for(scenario: str):
         st.session_state.enemy_shooters = S3_ENEMY_SOLDIERS
     else:
         st.session_state.enemy_shooters = M_ENEMY_START
+    st.session_state.enemy_cover = 0
 
 
+    # Szenario 3 Detail-Modus: Soldaten als Arrays (Struct-of-Arrays)
+    if scenario == "Szenario 3" and st.session_state.s3_detailed:
+        st.session_state.s3_player_army = soldiers.build_army(
+            st.session_state.player_shooters,
+            int(st.session_state.s3_army_firepower or 1),
+            float(st.session_state.s3_army_veterans or 0.0),
+            S3_SOLDIER_PROFILES,
+        )
+        st.session_state.s3_enemy_army = soldiers.build_army(
+            S3_ENEMY_SOLDIERS, S3_ENEMY_FIREPOWER, S3_ENEMY_VETERANS, S3_SOLDIER_PROFILES
+        )
+    else:
+        st.session_state.s3_player_army = None
+        st.session_state.s3_enemy_army = None
+
     st.session_state.winner = None
     st.session_state.log = []
 
@@ -296,6 +412,16 @@ def init_match_for(scenario: str):
 # ============================================================
 # Combat
 # ============================================================
+def deploy_enemy(scenario: str, player_total: int, player_shooters: int) -> int:
+    """Gegner-Verhalten: wie viele Gegner diese Runde schießen (Rest geht in Deckung)."""
+    enemy_total = st.session_state.enemy_cover + st.session_state.enemy_shooters
+    table = enemy_policy(st.session_state.enemy_behaviour, match_config_for(scenario, 0))
+    exposed = policies.enemy_exposed(table, enemy_total, player_total, player_shooters)
+    st.session_state.enemy_shooters = exposed
+    st.session_state.enemy_cover = enemy_total - exposed
+    return exposed
+
+
 def simulate_one_round_s2(player_shooters_target: int):
     player_total = st.session_state.player_cover + st.session_state.player_shooters
 
@@ -303,17 +429,17 @@ def simulate_one_round_s2(player_shooters_target: int):
     cover = player_total - shooters
     st.session_state.player_cover = cover
     st.session_state.player_shooters = shooters
+    deploy_enemy("Szenario 2", player_total, shooters)
 
     # -------- FIGHT RESULT (S2) --------
-    kills_on_enemy = min(
-        sum(1 for _ in range(shooters) if random.random() < HIT_CHANCE_S2),
+    kills_on_enemy, kills_on_player = kernels.fight(
+        kernels.MODE_CONSTANT,
+        shooters,
         st.session_state.enemy_shooters,
-    )
-
-    enemy_shooters = st.session_state.enemy_shooters
-    kills_on_player = min(
-        sum(1 for _ in range(enemy_shooters) if random.random() < HIT_CHANCE_S2),
-        st.session_state.player_shooters,
+        HIT_CHANCE_S2,
+        0,
+        1,
+        1,
     )
     # ----------------------------------
 
@@ -324,7 +450,7 @@ def simulate_one_round_s2(player_shooters_target: int):
     p_name = st.session_state.player_name
     e_name = st.session_state.enemy_name
     player_left = st.session_state.player_cover + st.session_state.player_shooters
-    enemy_left = max(0, st.session_state.enemy_shooters)
+    enemy_left = st.session_state.enemy_cover + max(0, st.session_state.enemy_shooters)
 
     append_log(
         f"Runde {st.session_state.round}: "
@@ -333,14 +459,14 @@ def simulate_one_round_s2(player_shooters_target: int):
         f"Stand: {p_name} = {player_left}, {e_name} = {enemy_left}"
     )
 
-    if st.session_state.enemy_shooters <= 0 or player_left <= 0:
+    if enemy_left <= 0 or player_left <= 0:
         st.session_state.game_over = True
         st.session_state.running = False
         st.session_state.games_played_s2 += 1
 
-        if player_left > 0 and st.session_state.enemy_shooters <= 0:
+        if player_left > 0 and enemy_left <= 0:
             st.session_state.winner = p_name
-        elif st.session_state.enemy_shooters > 0 and player_left <= 0:
+        elif enemy_left > 0 and player_left <= 0:
             st.session_state.winner = e_name
         else:
             st.session_state.winner = "Unentschieden"
@@ -355,23 +481,18 @@ def simulate_one_round_s1(player_shooters_target: int):
     cover = player_total - shooters
     st.session_state.player_cover = cover
     st.session_state.player_shooters = shooters
-
-    enemy_exposed = max(0, st.session_state.enemy_shooters)
-    p_hit_player = min(1.0, enemy_exposed / max(1, CROSS_SECTION_N_S1))
+    deploy_enemy("Szenario 1", player_total, shooters)
 
     # -------- FIGHT RESULT (S1) --------
-    kills_on_enemy = min(
-        sum(1 for _ in range(shooters) if random.random() < p_hit_player),
+    # Trefferchance pro Schütze = exponierte Gegner / n (und umgekehrt)
+    kills_on_enemy, kills_on_player = kernels.fight(
+        kernels.MODE_CROSS_SECTION,
+        shooters,
         st.session_state.enemy_shooters,
-    )
-
-    player_exposed = max(0, st.session_state.player_shooters)
-    p_hit_enemy = min(1.0, player_exposed / max(1, CROSS_SECTION_N_S1))
-
-    enemy_shooters = st.session_state.enemy_shooters
-    kills_on_player = min(
-        sum(1 for _ in range(enemy_shooters) if random.random() < p_hit_enemy),
-        st.session_state.player_shooters,
+        0.0,
+        CROSS_SECTION_N_S1,
+        1,
+        1,
     )
     # ----------------------------------
 
@@ -382,7 +503,7 @@ def simulate_one_round_s1(player_shooters_target: int):
     p_name = st.session_state.player_name
     e_name = st.session_state.enemy_name
     player_left = st.session_state.player_cover + st.session_state.player_shooters
-    enemy_left = max(0, st.session_state.enemy_shooters)
+    enemy_left = st.session_state.enemy_cover + max(0, st.session_state.enemy_shooters)
 
     append_log(
         f"Runde {st.session_state.round}: "
@@ -391,14 +512,14 @@ def simulate_one_round_s1(player_shooters_target: int):
         f"Stand: {p_name} = {player_left}, {e_name} = {enemy_left}"
     )
 
-    if st.session_state.enemy_shooters <= 0 or player_left <= 0:
+    if enemy_left <= 0 or player_left <= 0:
         st.session_state.game_over = True
         st.session_state.running = False
         st.session_state.games_played_s1 += 1
 
-        if player_left > 0 and st.session_state.enemy_shooters <= 0:
+        if player_left > 0 and enemy_left <= 0:
             st.session_state.winner = p_name
-        elif st.session_state.enemy_shooters > 0 and player_left <= 0:
+        elif enemy_left > 0 and player_left <= 0:
             st.session_state.winner = e_name
         else:
             st.session_state.winner = "Unentschieden"
@@ -414,24 +535,21 @@ def simulate_one_round_s3(player_shooters_target: int):
     cover = player_total - shooters
     st.session_state.player_cover = cover
     st.session_state.player_shooters = shooters
+    deploy_enemy("Szenario 3", player_total, shooters)
 
     player_firepower = int(st.session_state.s3_army_firepower or 1)
     enemy_firepower = int(S3_ENEMY_FIREPOWER)  # Gegner bleibt "Standard" (kannst du später erweitern)
 
     # -------- FIGHT RESULT (S3) --------
-    # Spieler: shooters * firepower Schüsse
-    player_shots = shooters * player_firepower
-    kills_on_enemy = min(
-        sum(1 for _ in range(player_shots) if random.random() < HIT_CHANCE_S2),
+    # Spieler: shooters * firepower Schüsse, Gegner: enemy_shooters * enemy_firepower Schüsse
+    kills_on_enemy, kills_on_player = kernels.fight(
+        kernels.MODE_CONSTANT,
+        shooters,
         st.session_state.enemy_shooters,
-    )
-
-    # Gegner: enemy_shooters * enemy_firepower Schüsse
-    enemy_shooters = st.session_state.enemy_shooters
-    enemy_shots = enemy_shooters * enemy_firepower
-    kills_on_player = min(
-        sum(1 for _ in range(enemy_shots) if random.random() < HIT_CHANCE_S2),
-        st.session_state.player_shooters,
+        HIT_CHANCE_S2,
+        0,
+        player_firepower,
+        enemy_firepower,
     )
     # ----------------------------------
 
@@ -442,7 +560,7 @@ def simulate_one_round_s3(player_shooters_target: int):
     p_name = st.session_state.player_name
     e_name = st.session_state.enemy_name
     player_left = st.session_state.player_cover + st.session_state.player_shooters
-    enemy_left = max(0, st.session_state.enemy_shooters)
+    enemy_left = st.session_state.enemy_cover + max(0, st.session_state.enemy_shooters)
 
     append_log(
         f"Runde {st.session_state.round}: "
@@ -451,14 +569,65 @@ def simulate_one_round_s3(player_shooters_target: int):
         f"Stand: {p_name} = {player_left}, {e_name} = {enemy_left}"
     )
 
-    if st.session_state.enemy_shooters <= 0 or player_left <= 0:
+    if enemy_left <= 0 or player_left <= 0:
         st.session_state.game_over = True
         st.session_state.running = False
         st.session_state.games_played_s3 += 1
 
-        if player_left > 0 and st.session_state.enemy_shooters <= 0:
+        if player_left > 0 and enemy_left <= 0:
             st.session_state.winner = p_name
-        elif st.session_state.enemy_shooters > 0 and player_left <= 0:
+        elif enemy_left > 0 and player_left <= 0:
+            st.session_state.winner = e_name
+        else:
+            st.session_state.winner = "Unentschieden"
+
+        append_log(f"Spielende: Gewinner ist {st.session_state.winner}.")
+
+
+def simulate_one_round_s3_detailed(player_shooters_target: int):
+    """Szenario 3 im Detail-Modus: jeder Soldat mit eigener Trefferchance, Feuerkraft und Moral."""
+    player_army = st.session_state.s3_player_army
+    enemy_army = st.session_state.s3_enemy_army
+
+    shooters = soldiers.deploy(player_army, player_shooters_target)
+    player_total = soldiers.alive_count(player_army)
+    st.session_state.player_shooters = shooters
+    st.session_state.player_cover = player_total - shooters
+
+    enemy_total = soldiers.alive_count(enemy_army)
+    table = enemy_policy(st.session_state.enemy_behaviour, match_config_for("Szenario 3", 0))
+    soldiers.deploy(enemy_army, policies.enemy_exposed(table, enemy_total, player_total, shooters))
+
+    # -------- FIGHT RESULT (S3 Detail) --------
+    kills_on_enemy, kills_on_player = soldiers.resolve_round(player_army, enemy_army)
+    # ----------------------------------
+
+    st.session_state.enemy_shooters = soldiers.exposed_count(enemy_army)
+    st.session_state.enemy_cover = soldiers.alive_count(enemy_army) - st.session_state.enemy_shooters
+    st.session_state.player_shooters -= kills_on_player
+    st.session_state.round += 1
+
+    p_name = st.session_state.player_name
+    e_name = st.session_state.enemy_name
+    player_left = st.session_state.player_cover + st.session_state.player_shooters
+    enemy_left = st.session_state.enemy_cover + max(0, st.session_state.enemy_shooters)
+    morale_pct = int(round(soldiers.mean_morale(player_army) * 100))
+
+    append_log(
+        f"Runde {st.session_state.round}: "
+        f"{p_name} (Moral {morale_pct}%) schaltet {kills_on_enemy} {plural(kills_on_enemy, 'Gegner')} aus, "
+        f"{e_name} schaltet {kills_on_player} {deine_schuetzen_phrase(kills_on_player)} aus. "
+        f"Stand: {p_name} = {player_left}, {e_name} = {enemy_left}"
+    )
+
+    if enemy_left <= 0 or player_left <= 0:
+        st.session_state.game_over = True
+        st.session_state.running = False
+        st.session_state.games_played_s3 += 1
+
+        if player_left > 0 and enemy_left <= 0:
+            st.session_state.winner = p_name
+        elif enemy_left > 0 and player_left <= 0:
             st.session_state.winner = e_name
         else:
             st.session_state.winner = "Unentschieden"
@@ -469,7 +638,55 @@ def simulate_one_round_s3(player_shooters_target: int):
 # ============================================================
 # BOOTSTRAP
 # ============================================================
+@st.cache_resource(show_spinner=False)
+def _warm_kernels() -> str:
+    # einmal pro Prozess; mit Numba wird der Maschinencode aus dem Disk-Cache geladen
+    return kernels.warmup()
+
+
+@st.cache_resource(show_spinner="Gegner-Verhalten wird vorberechnet ...")
+def _policy_tables() -> int:
+    # einmal pro Prozess: policies.npz laden bzw. fehlende Standard-Tabellen berechnen,
+    # damit kein Tick (und keine Session parallel) eine Tabelle bauen muss
+    return policies.preload()
+
+
+@st.cache_resource(show_spinner=False)
+def _snapshot_store() -> snapshot.SnapshotStore:
+    return snapshot.SnapshotStore()
+
+
+def session_token() -> str:
+    """Token aus der URL (?sid=...), sonst neu erzeugen – damit findet ein Reconnect sein Match wieder."""
+    token = st.query_params.get("sid", "")
+    if not (0 < len(token) <= 64 and token.replace("-", "").replace("_", "").isalnum()):
+        token = secrets.token_urlsafe(16)
+        st.query_params["sid"] = token
+    return token
+
+
+def save_snapshot():
+    snapshot.save(_snapshot_store(), st.session_state.session_token, st.session_state)
+
+
+_warm_kernels()
+_policy_tables()
+asset_manager()
+
+if "session_token" not in st.session_state:
+    st.session_state.session_token = session_token()
+    restorable = {
+        "page": {"start", "game", "explanation_s1", "explanation_s2", "army_select_s3"},
+        "current_scenario": {"Szenario 1", "Szenario 2", "Szenario 3"},
+        "enemy_behaviour": set(policies.BEHAVIOURS),
+        "s3_army_key": {a["key"] for a in S3_ARMIES} | {None},
+    }
+    if snapshot.restore(_snapshot_store(), st.session_state.session_token, st.session_state, restorable):
+        # nach Neustart/Reconnect: Match pausiert fortsetzen
+        st.session_state.running = False
+
 ensure_globals()
+save_snapshot()
 
 # ============================================================
 # SIDEBAR: Szenario wechseln
@@ -482,6 +699,18 @@ scenario_sidebar = st.sidebar.selectbox(
     index=["Szenario 1", "Szenario 2", "Szenario 3"].index(st.session_state.current_scenario)
 )
 
+st.session_state.enemy_behaviour = st.sidebar.selectbox(
+    "Gegner-Verhalten:",
+    list(policies.BEHAVIOURS),
+    index=list(policies.BEHAVIOURS).index(st.session_state.enemy_behaviour),
+    format_func=policies.BEHAVIOURS.get,
+)
+if (
+    st.session_state.enemy_behaviour != policies.DEFAULT_BEHAVIOUR
+    and not policies.supported(match_config_for(st.session_state.current_scenario, 0))
+):
+    st.sidebar.caption("Für diese Armeegrößen gibt es keine Gegner-Tabelle – der Gegner spielt gierig.")
+
 if st.sidebar.button("Szenario laden", use_container_width=True):
     init_match_for(scenario_sidebar)
     # init_match_for kann bei Szenario 3 auf army_select_s3 routen
@@ -494,6 +723,22 @@ if st.sidebar.button("Startseite", use_container_width=True):
     st.session_state.bg_file = START_BACKGROUND
     st.rerun()
 
+st.session_state.viewport = st.sidebar.selectbox(
+    "Bildgröße:",
+    list(assets.VIEWPORT_LABELS),
+    index=list(assets.VIEWPORT_LABELS).index(st.session_state.viewport),
+    format_func=assets.VIEWPORT_LABELS.get,
+)
+
+with st.sidebar.expander("Bild-Cache"):
+    cache_stats = asset_manager().stats()
+    st.caption(
+        f"Trefferquote: {cache_stats['hit_rate']:.0%} "
+        f"({cache_stats['hits']} Treffer, {cache_stats['misses']} Fehlgriffe)\n\n"
+        f"Speicher: {cache_stats['bytes'] / 2**20:.1f} / {cache_stats['max_bytes'] / 2**20:.0f} MB, "
+        f"{cache_stats['entries']} Varianten, {cache_stats['evictions']} verdrängt"
+    )
+
 
 # ============================================================
 # ROUTING: START PAGE
@@ -556,6 +801,12 @@ if st.session_state.page == "army_select_s3":
     st.markdown(f"**Beschreibung:** {chosen['desc']}")
     st.markdown(f"**Soldaten:** {chosen['soldiers']}")
     st.markdown(f"**Firepower:** {chosen['firepower']} (Schüsse pro Soldat pro Runde)")
+    st.markdown(f"**Veteranen:** {int(round(chosen['veterans'] * 100))}%")
+
+    detailed = st.checkbox(
+        "Detail-Modus: Veteranen & Rekruten (jeder Soldat mit eigener Trefferchance und Moral)",
+        value=st.session_state.s3_detailed,
+    )
 
     c1, c2 = st.columns(2)
     with c1:
@@ -563,6 +814,8 @@ if st.session_state.page == "army_select_s3":
             st.session_state.s3_army_key = chosen["key"]
             st.session_state.s3_army_soldiers = chosen["soldiers"]
             st.session_state.s3_army_firepower = chosen["firepower"]
+            st.session_state.s3_army_veterans = chosen["veterans"]
+            st.session_state.s3_detailed = detailed
 
             # Match jetzt initialisieren
             init_match_for("Szenario 3")
@@ -600,6 +853,8 @@ if st.session_state.page == "explanation_s1":
         height=420,
     )
 
+    render_trajectory_chart("Szenario 1")
+
     if st.button("Zurück zum Spiel", use_container_width=True):
         st.session_state.page = "game"
         st.rerun()
@@ -617,6 +872,8 @@ if st.session_state.page == "explanation_s2":
         height=420,
     )
 
+    render_trajectory_chart("Szenario 2")
+
     if st.button("Zurück zum Spiel", use_container_width=True):
         st.session_state.page = "game"
         st.rerun()
@@ -629,7 +886,7 @@ if st.session_state.page == "explanation_s2":
 # GAME UI
 # ============================================================
 player_total_now = st.session_state.player_cover + st.session_state.player_shooters
-enemy_total_now = max(0, st.session_state.enemy_shooters)
+enemy_total_now = st.session_state.enemy_cover + max(0, st.session_state.enemy_shooters)
 
 left, center, right = st.columns([1.15, 1.7, 1.15], vertical_alignment="top")
 
@@ -659,6 +916,7 @@ with right:
 
 with center:
     st.markdown(f"## {scenario}")
+    st.caption(f"Gegner-Verhalten: {policies.BEHAVIOURS[st.session_state.enemy_behaviour]}")
 
     if scenario == "Szenario 1":
         st.write(
@@ -667,6 +925,15 @@ with center:
         )
     elif scenario == "Szenario 2":
         st.write(f"Kampfregel: Trefferchance pro Schuss = **{int(HIT_CHANCE_S2*100)}%**")
+    elif st.session_state.s3_detailed:
+        fp = int(st.session_state.s3_army_firepower or 1)
+        vet = S3_SOLDIER_PROFILES["Veteran"]
+        rec = S3_SOLDIER_PROFILES["Rekrut"]
+        st.write(
+            f"Kampfregel (Detail-Modus): jeder Soldat schießt **{fp}×** pro Runde, "
+            f"Trefferchance Veteran **{int(vet['accuracy']*100)}%**, Rekrut **{int(rec['accuracy']*100)}%** "
+            "(× Moral). Die treffsichersten Soldaten erwidern zuerst das Feuer."
+        )
     else:
         fp = int(st.session_state.s3_army_firepower or 1)
         st.write(
@@ -786,7 +1053,7 @@ with center:
     # Ergebnis
     if st.session_state.game_over:
         p_left = st.session_state.player_cover + st.session_state.player_shooters
-        e_left = max(0, st.session_state.enemy_shooters)
+        e_left = st.session_state.enemy_cover + max(0, st.session_state.enemy_shooters)
         st.success(f"**Spiel beendet!** Gewinner: **{st.session_state.winner}**")
         st.write(f"Überlebt – {st.session_state.player_name}: **{p_left}**, {st.session_state.enemy_name}: **{e_left}**")
 
@@ -804,6 +1071,8 @@ with center:
 # ============================================================
 # Game-Loop: Tick
 # ============================================================
+save_snapshot()
+
 if st.session_state.running and not st.session_state.game_over:
     bgs = available_backgrounds_for(scenario)
     if bgs:
@@ -819,8 +1088,11 @@ if st.session_state.running and not st.session_state.game_over:
         simulate_one_round_s1(shooters_target)
     elif scenario == "Szenario 2":
         simulate_one_round_s2(shooters_target)
+    elif st.session_state.s3_detailed and st.session_state.s3_player_army is not None:
+        simulate_one_round_s3_detailed(shooters_target)
     else:
         simulate_one_round_s3(shooters_target)
 
+    save_snapshot()
     time.sleep(TICK_SECONDS)
     st.rerun()
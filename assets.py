@@ -0,0 +1,146 @@
+"""
+ZUGSPIEL – HINTERGRUNDBILDER (einmal prüfen, begrenzt cachen)
+
+    scan        beim Start einmal: welche Bilddateien gibt es, sind es
+                gültige PNGs? Danach kein Dateisystem-Zugriff pro Tick mehr.
+    data_uri    fertig kodierte Variante (verkleinert je Viewport-Klasse,
+                base64 als data:-URI) – erst bei Bedarf erzeugt, dann im LRU.
+                Ist die Datei inzwischen weg oder kaputt: "" und die Datei
+                gilt nicht mehr als gültig.
+    LRU         nach Bytes begrenzt, älteste Variante fliegt zuerst raus
+    stats       Trefferquote und Speicherverbrauch
+
+Verkleinern braucht Pillow; ohne Pillow wird immer das Original geliefert.
+Bilder mit Transparenz bleiben PNG, alle anderen werden JPEG – außer das
+Original ist ohnehin kleiner.
+"""
+
+import base64
+import io
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow ist optional
+    Image = None
+
+# Fehler beim (erneuten) Lesen/Dekodieren einer Bilddatei
+_DECODE_ERRORS = (OSError, ValueError) + ((Image.DecompressionBombError,) if Image else ())
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Viewport-Klasse -> maximale Bildbreite in Pixeln (None = Original)
+VIEWPORTS = {
+    "mobile": 900,
+    "desktop": 1920,
+    "original": None,
+}
+VIEWPORT_LABELS = {
+    "mobile": "Klein (Mobil)",
+    "desktop": "Normal (Desktop)",
+    "original": "Original",
+}
+DEFAULT_VIEWPORT = "desktop"
+
+JPEG_QUALITY = 82
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class AssetManager:
+    def __init__(self, paths: list[str], max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()  # (path, viewport) -> data-URI
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.valid = self._scan(paths)
+
+    @staticmethod
+    def _scan(paths: list[str]) -> frozenset[str]:
+        valid = set()
+        for path in dict.fromkeys(paths):
+            p = Path(path)
+            try:
+                with p.open("rb") as f:
+                    if f.read(len(PNG_SIGNATURE)) == PNG_SIGNATURE:
+                        valid.add(path)
+            except OSError:
+                continue
+        return frozenset(valid)
+
+    def available(self, paths: list[str]) -> list[str]:
+        return [p for p in paths if p in self.valid]
+
+    def _encode(self, path: str, viewport: str) -> str:
+        raw = Path(path).read_bytes()
+        if not raw.startswith(PNG_SIGNATURE):
+            raise ValueError(f"kein PNG mehr: {path}")
+        max_width = VIEWPORTS.get(viewport)
+        if Image is None or max_width is None:
+            return "data:image/png;base64," + base64.b64encode(raw).decode()
+
+        with Image.open(io.BytesIO(raw)) as img:
+            resized = img.width > max_width
+            if resized:
+                img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+            out = io.BytesIO()
+            if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+                img.save(out, format="PNG", optimize=True)  # JPEG hat keinen Alphakanal
+                mime = "image/png"
+            else:
+                img.convert("RGB").save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+                mime = "image/jpeg"
+        data = out.getvalue()
+        if not resized and len(raw) <= len(data):
+            data, mime = raw, "image/png"
+        return f"data:{mime};base64," + base64.b64encode(data).decode()
+
+    def data_uri(self, path: str, viewport: str = DEFAULT_VIEWPORT) -> str:
+        """Kodiertes Bild als data:-URI, "" wenn die Datei beim Scan nicht gültig war."""
+        if path not in self.valid:
+            return ""
+        if Image is None or VIEWPORTS.get(viewport) is None:
+            viewport = "original"  # nur eine Variante, nicht dasselbe Bild mehrfach cachen
+        key = (path, viewport)
+        with self._lock:
+            uri = self._cache.get(key)
+            if uri is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return uri
+            self.misses += 1
+
+        try:
+            uri = self._encode(path, viewport)
+        except _DECODE_ERRORS:
+            # nach dem Scan gelöscht/ersetzt: nicht die Seite abstürzen lassen
+            with self._lock:
+                self.valid = self.valid - {path}
+            return ""
+
+        with self._lock:
+            if key not in self._cache and len(uri) <= self.max_bytes:
+                self._cache[key] = uri
+                self._bytes += len(uri)
+                while self._bytes > self.max_bytes:
+                    _, old = self._cache.popitem(last=False)
+                    self._bytes -= len(old)
+                    self.evictions += 1
+        return uri
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
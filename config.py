@@ -0,0 +1,78 @@
+"""
+ZUGSPIEL – SPIELREGELN (Konfiguration)
+
+Alle Zahlen, die das Gefecht bestimmen. Ohne Streamlit importierbar, damit
+auch Sweeps, Worker und Dienste dieselben Regeln verwenden wie die App.
+"""
+
+import kernels
+
+N_PLAYER_START = 50
+M_ENEMY_START = 30
+
+# Szenario 3: Gegner-Setup (konfigurierbar)
+S3_ENEMY_SOLDIERS = 45
+S3_ENEMY_FIREPOWER = 2
+
+# Szenario 2: konstante Trefferchance pro Schuss
+HIT_CHANCE_S2 = 0.10
+
+# Szenario 1: Querschnitt n, Trefferchance pro Schütze = exposed / n
+CROSS_SECTION_N_S1 = 40
+
+# Szenario 3: Armeen (3 Optionen)
+S3_ARMIES = [
+    {
+        "key": "Sturmtrupp",
+        "soldiers": 35,
+        "firepower": 3,
+        "veterans": 0.6,
+        "desc": "Aggressiv, hohe Feuerkraft, weniger Mannstärke.",
+    },
+    {
+        "key": "Infanterie",
+        "soldiers": 50,
+        "firepower": 2,
+        "veterans": 0.3,
+        "desc": "Ausgewogen: solide Mannstärke und Feuerkraft.",
+    },
+    {
+        "key": "Miliz",
+        "soldiers": 70,
+        "firepower": 1,
+        "veterans": 0.1,
+        "desc": "Viele Soldaten, aber geringe Feuerkraft.",
+    },
+]
+
+# Szenario 3 Detail-Modus: Soldaten-Profile (Trefferchance pro Schuss, Start-Moral)
+S3_SOLDIER_PROFILES = {
+    "Veteran": {"accuracy": 0.14, "morale": 1.0},
+    "Rekrut": {"accuracy": 0.08, "morale": 0.85},
+}
+S3_ENEMY_VETERANS = 0.3
+
+
+def match_config(scenario: str, shooters_target: int, army: dict | None = None,
+                 hit_chance: float = HIT_CHANCE_S2) -> kernels.MatchConfig:
+    """Zähler-Modell eines Szenarios als Kernel-Konfiguration.
+
+    army: Eintrag aus S3_ARMIES (nur Szenario 3, sonst ignoriert).
+    """
+    if scenario == "Szenario 1":
+        return kernels.MatchConfig(
+            kernels.MODE_CROSS_SECTION, 0.0, CROSS_SECTION_N_S1, 1, 1,
+            N_PLAYER_START, M_ENEMY_START, shooters_target,
+        )
+    if scenario == "Szenario 2":
+        return kernels.MatchConfig(
+            kernels.MODE_CONSTANT, hit_chance, 0, 1, 1,
+            N_PLAYER_START, M_ENEMY_START, shooters_target,
+        )
+    army = army or {}
+    return kernels.MatchConfig(
+        kernels.MODE_CONSTANT, hit_chance, 0,
+        int(army.get("firepower") or 1), S3_ENEMY_FIREPOWER,
+        int(army.get("soldiers") or N_PLAYER_START), S3_ENEMY_SOLDIERS,
+        shooters_target,
+    )
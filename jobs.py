@@ -0,0 +1,328 @@
+"""
+ZUGSPIEL – SWEEP-WARTESCHLANGE (fortsetzbar, beliebig viele Worker)
+
+Große Sweeps (Armeen aus S3_ARMIES × Trefferchancen × Schützen-Anteile)
+dauern Stunden. Jeder Sweep-Punkt ist ein Arbeitspaket in einer SQLite-Datei;
+beliebig viele Worker-Prozesse holen sich Pakete per Lease und rechnen sie in
+Blöcken ab.
+
+Die Datei muss auf einer lokalen Platte liegen, alle Worker laufen auf dieser
+Maschine. Auf Netzlaufwerken (NFS, SMB/CIFS) ist das Datei-Locking von SQLite
+unzuverlässig – gleichzeitige Worker verschiedener Rechner können die Datei
+beschädigen. Mehrere Rechner: je Rechner eigene Datei, z. B. mit disjunkten
+--target-shares.
+
+    Checkpoint   nach jedem Block werden Teilergebnisse committet
+    Lease        hängt ein Worker (Absturz, Kill), läuft die Lease ab und
+                 ein anderer macht beim letzten Checkpoint weiter
+    Idempotenz   jeder Block hat einen festen Seed (Paket + Offset) und wird
+                 nur committet, wenn der Checkpoint noch passt – ein
+                 wiederholter Block liefert dasselbe und zählt nie doppelt
+
+Benutzung:
+    python jobs.py enqueue sweep.sqlite --scenario "Szenario 3" --hit-chances 0.05:0.20:0.05
+    python jobs.py work sweep.sqlite --workers 8
+    python jobs.py status sweep.sqlite --items
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+import zlib
+
+import config
+import kernels
+import policies
+
+CHUNK_MATCHES = 2000
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 5
+MAX_ROUNDS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    params TEXT NOT NULL,
+    total_matches INTEGER NOT NULL,
+    done_matches INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    rounds_sum INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, lease_until);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path, timeout=60, isolation_level=None)
+    db.execute("PRAGMA busy_timeout = 60000")
+    db.executescript(_SCHEMA)
+    return db
+
+
+# ============================================================
+# Sweep anlegen
+# ============================================================
+MAX_GRID_POINTS = 1000
+
+
+def _grid(spec: str) -> list[float]:
+    """"0.05:0.2:0.05" -> [0.05, 0.1, 0.15, 0.2]; "0.1,0.3" -> [0.1, 0.3].
+
+    Alle Werte sind Wahrscheinlichkeiten bzw. Anteile (0..1). Als argparse-Typ
+    gedacht: Fehler kommen als ArgumentTypeError.
+    """
+    try:
+        if ":" in spec:
+            lo, hi, step = (float(x) for x in spec.split(":"))
+        else:
+            values = [float(x) for x in spec.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{spec!r}: erwartet lo:hi:step oder a,b,c") from None
+
+    if ":" in spec:
+        if not step > 0:
+            raise argparse.ArgumentTypeError(f"{spec!r}: step muss > 0 sein")
+        if not 0.0 <= lo <= hi <= 1.0:
+            raise argparse.ArgumentTypeError(f"{spec!r}: es muss 0 <= lo <= hi <= 1 gelten")
+        n = int((hi - lo) / step + 1e-9) + 1  # hi nur, wenn es (fast) genau getroffen wird
+        if n > MAX_GRID_POINTS:
+            raise argparse.ArgumentTypeError(f"{spec!r}: mehr als {MAX_GRID_POINTS} Werte")
+        values = [round(lo + i * step, 10) for i in range(n)]
+
+    if not all(0.0 <= v <= 1.0 for v in values):
+        raise argparse.ArgumentTypeError(f"{spec!r}: Werte müssen zwischen 0 und 1 liegen")
+    return values
+
+
+def enqueue(db: sqlite3.Connection, scenario: str, hit_chances: list[float],
+            target_shares: list[float], matches: int,
+            behaviours: tuple[str, ...] = (policies.DEFAULT_BEHAVIOUR,)) -> int:
+    """Legt alle Sweep-Punkte an. Schon vorhandene Punkte bleiben unberührt. Rückgabe: neue Pakete."""
+    unknown = set(behaviours) - set(policies.BEHAVIOURS)
+    if unknown:
+        raise ValueError(f"unbekanntes Gegner-Verhalten: {', '.join(sorted(unknown))}")
+    armies = config.S3_ARMIES if scenario == "Szenario 3" else [None]
+    if scenario == "Szenario 1":
+        hit_chances = [0.0]  # Querschnitt-Modell: Trefferchance ergibt sich aus n
+    rows = []
+    for army, hit_chance, share, behaviour in itertools.product(
+        armies, hit_chances, target_shares, behaviours
+    ):
+        params = {
+            "scenario": scenario,
+            "army": army["key"] if army else None,
+            "hit_chance": hit_chance,
+            "target_share": share,
+        }
+        if behaviour != policies.DEFAULT_BEHAVIOUR:
+            params["enemy"] = behaviour  # Standard-Gegner ohne Feld -> Schlüssel alter Sweeps bleiben gleich
+        key = json.dumps(params, sort_keys=True)
+        rows.append((key, key, matches, time.time()))
+
+    before = db.total_changes
+    db.executemany(
+        "INSERT OR IGNORE INTO items (key, params, total_matches, updated) VALUES (?, ?, ?, ?)", rows
+    )
+    return db.total_changes - before
+
+
+def _item_config(params: dict) -> kernels.MatchConfig:
+    army = next((a for a in config.S3_ARMIES if a["key"] == params["army"]), None)
+    cfg = config.match_config(params["scenario"], 0, army, params["hit_chance"])
+    return cfg._replace(target=int(round(cfg.player_start * params["target_share"])))
+
+
+# ============================================================
+# Worker
+# ============================================================
+def _claim(db: sqlite3.Connection, worker: str):
+    now = time.time()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        # Lease abgelaufen und keine Versuche mehr übrig: Worker ist dabei gestorben
+        # (OOM, Absturz im JIT ...) – nicht endlos neu vergeben
+        db.execute(
+            "UPDATE items SET status = 'failed', error = ?, updated = ? "
+            "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+            (f"Lease abgelaufen nach {MAX_ATTEMPTS} Versuchen", now, now, MAX_ATTEMPTS),
+        )
+        row = db.execute(
+            "SELECT id, key, params, total_matches, done_matches FROM items "
+            "WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) "
+            "ORDER BY id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is not None:
+            db.execute(
+                "UPDATE items SET status = 'running', worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker, now + LEASE_SECONDS, now, row[0]),
+            )
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _run_item(db: sqlite3.Connection, worker: str, row) -> bool:
+    item_id, key, params, total, done = row
+    params = json.loads(params)
+    cfg = _item_config(params)
+    table = policies.table_for(params.get("enemy", policies.DEFAULT_BEHAVIOUR), cfg)
+
+    while done < total:
+        n = min(CHUNK_MATCHES, total - done)
+        kernels.seed(zlib.crc32(f"{key}|{done}".encode()))
+        rounds, player_left, enemy_left = kernels.simulate_batch([cfg], n, MAX_ROUNDS, table)
+        wins = int(((player_left > 0) & (enemy_left <= 0)).sum())
+        losses = int(((enemy_left > 0) & (player_left <= 0)).sum())
+
+        now = time.time()
+        cur = db.execute(
+            "UPDATE items SET done_matches = done_matches + ?, wins = wins + ?, losses = losses + ?, "
+            "draws = draws + ?, rounds_sum = rounds_sum + ?, lease_until = ?, updated = ?, "
+            "status = CASE WHEN done_matches + ? >= total_matches THEN 'done' ELSE status END "
+            "WHERE id = ? AND worker = ? AND done_matches = ? AND status = 'running'",
+            (n, wins, losses, n - wins - losses, int(rounds.sum()), now + LEASE_SECONDS, now,
+             n, item_id, worker, done),
+        )
+        if cur.rowcount == 0:
+            return False  # Lease verloren – ein anderer Worker macht weiter
+        done += n
+    return True
+
+
+def work(path: str, worker: str | None = None) -> int:
+    """Arbeitet Pakete ab, bis keine mehr offen sind. Rückgabe: fertige Pakete."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    db = connect(path)
+    kernels.warmup()
+    finished = 0
+    while True:
+        row = _claim(db, worker)
+        if row is None:
+            return finished
+        try:
+            finished += _run_item(db, worker, row)
+        except Exception as exc:
+            db.execute(
+                "UPDATE items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_until = 0, updated = ? WHERE id = ? AND worker = ?",
+                (MAX_ATTEMPTS, repr(exc), time.time(), row[0], worker),
+            )
+
+
+def retry_failed(db: sqlite3.Connection) -> int:
+    cur = db.execute("UPDATE items SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+    return cur.rowcount
+
+
+# ============================================================
+# Fortschritt
+# ============================================================
+def progress(db: sqlite3.Connection) -> dict:
+    by_status = dict(db.execute("SELECT status, COUNT(*) FROM items GROUP BY status"))
+    done, total = db.execute(
+        "SELECT COALESCE(SUM(done_matches), 0), COALESCE(SUM(total_matches), 0) FROM items"
+    ).fetchone()
+    workers = db.execute(
+        "SELECT COUNT(DISTINCT worker) FROM items WHERE status = 'running' AND lease_until >= ?",
+        (time.time(),),
+    ).fetchone()[0]
+    return {"items": by_status, "done_matches": done, "total_matches": total, "workers": workers}
+
+
+def results(db: sqlite3.Connection) -> list[dict]:
+    out = []
+    for params, total, done, wins, losses, draws, rounds_sum, status in db.execute(
+        "SELECT params, total_matches, done_matches, wins, losses, draws, rounds_sum, status "
+        "FROM items ORDER BY id"
+    ):
+        out.append({
+            **json.loads(params),
+            "status": status,
+            "done": done,
+            "total": total,
+            "win_rate": wins / done if done else None,
+            "loss_rate": losses / done if done else None,
+            "draw_rate": draws / done if done else None,
+            "mean_rounds": rounds_sum / done if done else None,
+        })
+    return out
+
+
+def _print_status(path: str, show_items: bool):
+    db = connect(path)
+    p = progress(db)
+    pct = 100.0 * p["done_matches"] / p["total_matches"] if p["total_matches"] else 0.0
+    states = ", ".join(f"{k}: {v}" for k, v in sorted(p["items"].items())) or "leer"
+    print(f"{pct:5.1f}%  {p['done_matches']}/{p['total_matches']} Matches  |  {states}  |  aktive Worker: {p['workers']}")
+    if show_items:
+        for r in results(db):
+            win = "   -  " if r["win_rate"] is None else f"{100 * r['win_rate']:5.1f}%"
+            print(
+                f"{r['status']:8} {r['done']:>8}/{r['total']:<8} Sieg {win}  "
+                f"{r['scenario']} {r['army'] or '-'} p={r['hit_chance']} schießen={r['target_share']:.0%} "
+                f"Gegner={r.get('enemy', policies.DEFAULT_BEHAVIOUR)}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zugspiel Sweep-Warteschlange")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_enq = sub.add_parser("enqueue", help="Sweep-Punkte anlegen")
+    p_enq.add_argument("db")
+    p_enq.add_argument("--scenario", default="Szenario 3", choices=["Szenario 1", "Szenario 2", "Szenario 3"])
+    p_enq.add_argument("--hit-chances", type=_grid, default=str(config.HIT_CHANCE_S2))
+    p_enq.add_argument("--target-shares", type=_grid, default="0.25,0.5,0.75,1.0")
+    p_enq.add_argument("--matches", type=int, default=100_000)
+    p_enq.add_argument("--enemy", default=policies.DEFAULT_BEHAVIOUR,
+                       help=f"Gegner-Verhalten, kommagetrennt: {','.join(policies.BEHAVIOURS)}")
+
+    p_work = sub.add_parser("work", help="Pakete abarbeiten")
+    p_work.add_argument("db")
+    p_work.add_argument("--workers", type=int, default=1)
+
+    p_status = sub.add_parser("status", help="Fortschritt anzeigen")
+    p_status.add_argument("db")
+    p_status.add_argument("--items", action="store_true")
+
+    p_retry = sub.add_parser("retry", help="fehlgeschlagene Pakete wieder freigeben")
+    p_retry.add_argument("db")
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "enqueue":
+        n = enqueue(connect(args.db), args.scenario, args.hit_chances, args.target_shares,
+                    args.matches, tuple(args.enemy.split(",")))
+        print(f"{n} neue Pakete.")
+    elif args.cmd == "work":
+        if args.workers <= 1:
+            print(f"{work(args.db)} Pakete fertig.")
+        else:
+            with multiprocessing.Pool(args.workers) as pool:
+                print(f"{sum(pool.map(work, [args.db] * args.workers))} Pakete fertig.")
+    elif args.cmd == "status":
+        _print_status(args.db, args.items)
+    else:
+        print(f"{retry_failed(connect(args.db))} Pakete wieder offen.")
+
+
+if __name__ == "__main__":
+    main()
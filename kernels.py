@@ -0,0 +1,212 @@
+"""
+ZUGSPIEL – RECHENKERNE (Runde + Batch)
+
+Die eigentliche Kampf-Mathematik, ohne Streamlit:
+
+    fight(...)                 eine Runde (alle Szenarien, Zähler-Modell)
+    simulate_batch(...)        viele komplette Matches -> Runden, Überlebende
+    simulate_trajectories(...) viele Matches, Truppenstärke pro Runde
+
+Gegner-Verhalten: optional eine Tabelle aus policies.py
+(gegner_schützen[gegner_gesamt, spieler_gesamt, spieler_schützen]);
+ohne Tabelle schießen immer alle Gegner.
+
+Backend:
+    Ist Numba installiert, werden die Kerne beim ersten Aufruf kompiliert
+    (njit, cache=True -> Maschinencode landet in __pycache__ bzw.
+    NUMBA_CACHE_DIR und wird beim nächsten Serverstart nur noch geladen).
+    Ohne Numba laufen dieselben Funktionen als Python/NumPy.
+    Erzwingen per Umgebungsvariable: ZUGSPIEL_BACKEND=python
+"""
+
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # Numba ist optional
+    numba = None
+
+MODE_CONSTANT = 0       # Szenario 2/3: konstante Trefferchance pro Schuss
+MODE_CROSS_SECTION = 1  # Szenario 1: Trefferchance = exponierte Ziele / n
+
+_REQUESTED_BACKEND = os.environ.get("ZUGSPIEL_BACKEND", "auto").lower()
+BACKEND = "numba" if numba is not None and _REQUESTED_BACKEND != "python" else "python"
+
+
+def _jit(fn):
+    if BACKEND != "numba":
+        return fn
+    # nogil: große Simulationen auf einem Thread halten andere Threads nicht auf
+    return numba.njit(cache=True, nogil=True)(fn)
+
+
+class MatchConfig(NamedTuple):
+    mode: int
+    p_hit: float
+    cross_n: int
+    player_fp: int
+    enemy_fp: int
+    player_start: int
+    enemy_start: int
+    target: int  # Spieler: wie viele schießen (Rest in Deckung)
+
+
+# ============================================================
+# Kerne
+# ============================================================
+@_jit
+def _hits(shots, p):
+    if shots <= 0 or p <= 0.0:
+        return 0
+    if p >= 1.0:
+        return shots
+    return int(np.random.binomial(shots, p))
+
+
+@_jit
+def fight(mode, player_shooters, enemy_exposed, p_hit, cross_n, player_fp, enemy_fp):
+    """Eine Runde: (kills_on_enemy, kills_on_player). Beide Seiten feuern gleichzeitig."""
+    if mode == MODE_CROSS_SECTION:
+        n = max(1, cross_n)
+        p_hit_player = min(1.0, max(0, enemy_exposed) / n)
+        p_hit_enemy = min(1.0, max(0, player_shooters) / n)
+    else:
+        p_hit_player = p_hit
+        p_hit_enemy = p_hit
+
+    kills_on_enemy = min(_hits(player_shooters * player_fp, p_hit_player), enemy_exposed)
+    kills_on_player = min(_hits(enemy_exposed * enemy_fp, p_hit_enemy), player_shooters)
+    return kills_on_enemy, kills_on_player
+
+
+@_jit
+def _simulate(mode, p_hit, cross_n, player_fp, enemy_fp, player_start, enemy_start, target,
+              max_rounds, record, policy):
+    n = player_start.shape[0]
+    has_policy = policy.shape[0] > 0
+    width = max_rounds + 1 if record else 1
+    player_traj = np.zeros((n, width), dtype=np.int64)
+    enemy_traj = np.zeros((n, width), dtype=np.int64)
+    rounds = np.zeros(n, dtype=np.int64)
+    player_left = np.zeros(n, dtype=np.int64)
+    enemy_left = np.zeros(n, dtype=np.int64)
+
+    for i in range(n):
+        player = player_start[i]
+        enemy = enemy_start[i]
+        if record:
+            player_traj[i, 0] = player
+            enemy_traj[i, 0] = enemy
+        r = 0
+        while player > 0 and enemy > 0 and r < max_rounds:
+            shooters = min(max(0, target[i]), player)
+            enemy_exposed = enemy
+            if has_policy:
+                enemy_exposed = min(enemy, int(policy[
+                    min(enemy, policy.shape[0] - 1),
+                    min(player, policy.shape[1] - 1),
+                    min(shooters, policy.shape[2] - 1),
+                ]))
+            kills_on_enemy, kills_on_player = fight(
+                mode[i], shooters, enemy_exposed, p_hit[i], cross_n[i], player_fp[i], enemy_fp[i]
+            )
+            enemy -= kills_on_enemy
+            player -= kills_on_player
+            r += 1
+            if record:
+                player_traj[i, r] = player
+                enemy_traj[i, r] = enemy
+        if record:
+            # Nach Spielende bleibt der Endstand stehen
+            for j in range(r + 1, width):
+                player_traj[i, j] = player
+                enemy_traj[i, j] = enemy
+        rounds[i] = r
+        player_left[i] = player
+        enemy_left[i] = enemy
+
+    return rounds, player_left, enemy_left, player_traj, enemy_traj
+
+
+@_jit
+def _seed(value):
+    np.random.seed(value)
+
+
+# ============================================================
+# Python-API
+# ============================================================
+_NO_POLICY = np.zeros((0, 0, 0), dtype=np.uint16)
+
+
+def _as_arrays(configs: list[MatchConfig], repeat: int | list[int]):
+    cols = list(zip(*configs)) if configs else [()] * len(MatchConfig._fields)
+    out = []
+    for name, col in zip(MatchConfig._fields, cols):
+        dtype = np.float64 if name == "p_hit" else np.int64
+        out.append(np.repeat(np.asarray(col, dtype=dtype), repeat))
+    return out
+
+
+def _policy_array(policy: np.ndarray | None) -> np.ndarray:
+    if policy is None:
+        return _NO_POLICY
+    return np.ascontiguousarray(policy, dtype=np.uint16)
+
+
+def simulate_batch(configs: list[MatchConfig], repeat: int | list[int] = 1, max_rounds: int = 500,
+                   policy: np.ndarray | None = None):
+    """Simuliert jede Konfiguration `repeat`-mal (oder repeat[i]-mal, eine Zahl je Konfiguration).
+
+    Rückgabe: (rounds, player_left, enemy_left), je Länge sum(Wiederholungen),
+    Matches einer Konfiguration liegen zusammenhängend. `policy` gilt für alle
+    Konfigurationen des Aufrufs.
+    """
+    rounds, player_left, enemy_left, _, _ = _simulate(
+        *_as_arrays(configs, repeat), max_rounds, False, _policy_array(policy)
+    )
+    return rounds, player_left, enemy_left
+
+
+def simulate_trajectories(config: MatchConfig, n_matches: int, max_rounds: int,
+                          policy: np.ndarray | None = None):
+    """Truppenstärke pro Runde: (player_traj, enemy_traj), Form (n_matches, max_rounds + 1)."""
+    _, _, _, player_traj, enemy_traj = _simulate(
+        *_as_arrays([config], n_matches), max_rounds, True, _policy_array(policy)
+    )
+    return player_traj, enemy_traj
+
+
+def seed(value: int):
+    np.random.seed(value)
+    if BACKEND == "numba":
+        _seed(value)
+
+
+def _use_python():
+    global BACKEND, _hits, fight, _simulate, _seed
+    BACKEND = "python"
+    _hits, fight, _simulate, _seed = (
+        getattr(f, "py_func", f) for f in (_hits, fight, _simulate, _seed)
+    )
+
+
+def warmup() -> str:
+    """Kompiliert (bzw. lädt aus dem Cache) alle Kerne einmal. Rückgabe: aktives Backend.
+
+    Schlägt das Kompilieren fehl, wird automatisch auf Python/NumPy umgestellt.
+    """
+    cfg = MatchConfig(MODE_CROSS_SECTION, 0.1, 40, 1, 1, 3, 3, 3)
+    try:
+        fight(MODE_CONSTANT, 1, 1, 0.5, 0, 1, 1)
+        simulate_batch([cfg])
+        simulate_batch([cfg], policy=np.full((4, 4, 4), 3, dtype=np.uint16))
+        simulate_trajectories(cfg, 1, 2)
+    except Exception:
+        if BACKEND != "numba":
+            raise
+        _use_python()
+    return BACKEND
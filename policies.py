@@ -0,0 +1,325 @@
+"""
+ZUGSPIEL – GEGNER-VERHALTEN (vorberechnete Deckungs-/Feuer-Tabellen)
+
+Der Gegner entscheidet jede Runde, wie viele seiner Soldaten schießen (der
+Rest geht in Deckung). Die Entscheidung wird NICHT pro Tick berechnet,
+sondern aus einer Tabelle gelesen:
+
+    table[gegner_gesamt, spieler_gesamt, spieler_schützen] -> gegner_schützen
+
+Verhalten:
+    greedy    alle schießen (maximal viele Treffer jetzt) – bisheriges Verhalten
+    cautious  eigene Soldaten zählen doppelt: lieber Deckung, wenn der
+              erwartete Tausch dieser Runde ungünstig ist (schaut nicht voraus)
+    optimal   beste Antwort auf einen Spieler, der seine Schützenzahl hält:
+              Rückwärtsinduktion über alle Zustände (gegner, spieler) mit dem
+              Treffermodell der Kerne, maximiert P(Sieg) + ½ P(Unentschieden)
+
+Für alle Verhalten gilt MIN_EXPOSED_SHARE (niemand versteckt sich komplett).
+
+Tabellen für die Standard-Szenarien offline erzeugen:
+    python policies.py build            (-> policies.npz)
+Standard-Tabellen werden einmal pro Prozess geladen bzw. berechnet (preload).
+Andere Konfigurationen (z. B. Sweeps über die Trefferchance) nur auf
+Wunsch; die landen in einem nach Bytes begrenzten LRU.
+"""
+
+import argparse
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+import kernels
+
+BEHAVIOURS = {
+    "greedy": "Gierig (alle schießen)",
+    "cautious": "Vorsichtig",
+    "optimal": "Beste Antwort (rechnet voraus)",
+}
+DEFAULT_BEHAVIOUR = "greedy"
+
+POLICY_FILE = os.environ.get("ZUGSPIEL_POLICY_FILE", "policies.npz")
+
+CAUTIOUS_LOSS_WEIGHT = 2.0
+# Mindestens so viele schießen immer – sonst könnten sich beide Seiten endlos verstecken
+MIN_EXPOSED_SHARE = 0.2
+# Obergrenze Tabellengröße (Zellen); bei riesigen Armeen lieber ablehnen als den Speicher sprengen
+MAX_TABLE_CELLS = 20_000_000
+# Tabellen sind uint16 -> mehr Gegner passen nicht hinein
+MAX_TABLE_ENEMY = np.iinfo(np.uint16).max
+# Speichergrenze für Tabellen außerhalb der Standard-Szenarien
+CUSTOM_CACHE_BYTES = 64 * 1024 * 1024
+
+_tables: dict[str, np.ndarray] | None = None  # Standard-Szenarien (Datei bzw. berechnet)
+_custom = OrderedDict()  # policy_key -> Tabelle, LRU
+_custom_bytes = 0
+_lock = threading.Lock()
+_build_lock = threading.Lock()  # jede Tabelle nur einmal berechnen, auch bei parallelen Sessions
+
+
+def policy_key(behaviour: str, cfg: kernels.MatchConfig) -> str:
+    return "__".join([
+        behaviour,
+        str(cfg.mode),
+        float(cfg.p_hit).hex().replace(".", "_"),  # exakt, nicht gerundet
+        str(cfg.cross_n),
+        str(cfg.player_fp),
+        str(cfg.enemy_fp),
+        str(cfg.player_start),
+        str(cfg.enemy_start),
+    ])
+
+
+def _hit_chances(cfg: kernels.MatchConfig, enemy_exposed: np.ndarray, player_exposed: np.ndarray):
+    """(Trefferchance der Spieler-Schüsse, Trefferchance der Gegner-Schüsse) wie in kernels.fight."""
+    if cfg.mode == kernels.MODE_CROSS_SECTION:
+        n = max(1, cfg.cross_n)
+        return np.minimum(1.0, enemy_exposed / n), np.minimum(1.0, player_exposed / n)
+    return np.full(np.shape(enemy_exposed), cfg.p_hit), np.full(np.shape(player_exposed), cfg.p_hit)
+
+
+def table_cells(cfg: kernels.MatchConfig) -> int:
+    return (cfg.enemy_start + 1) * (cfg.player_start + 1) ** 2
+
+
+def supported(cfg: kernels.MatchConfig) -> bool:
+    """Passt eine Tabelle für diese Armeegrößen (Speicher, uint16)?"""
+    return table_cells(cfg) <= MAX_TABLE_CELLS and cfg.enemy_start <= MAX_TABLE_ENEMY
+
+
+def _floor(enemy_total: int) -> int:
+    return math.ceil(MIN_EXPOSED_SHARE * enemy_total)
+
+
+def _cautious(cfg: kernels.MatchConfig) -> np.ndarray:
+    """Kurzsichtig: erwartete Treffer minus doppelt gewichtete eigene Verluste dieser Runde.
+
+    Der Wert hängt nur von (gegner_schützen, spieler_schützen) ab -> einmal als
+    (E+1, P+1)-Matrix rechnen, dann je Gegner-Gesamtzahl das beste erlaubte e wählen.
+    """
+    E, P = cfg.enemy_start, cfg.player_start
+    e = np.arange(E + 1).reshape(-1, 1)
+    s = np.arange(P + 1).reshape(1, -1)
+    p_hit_player, p_hit_enemy = _hit_chances(cfg, e, s)
+    inflicted = np.minimum(e * cfg.enemy_fp * p_hit_enemy, s)
+    losses = np.minimum(s * cfg.player_fp * p_hit_player, e)
+    score = inflicted - CAUTIOUS_LOSS_WEIGHT * losses
+
+    best = np.zeros((E + 1, P + 1), dtype=np.uint16)
+    for total in range(1, E + 1):
+        lo = _floor(total)
+        # argmax nimmt bei Gleichstand das erste -> weniger zeigen
+        best[total] = lo + np.argmax(score[lo : total + 1], axis=0)
+    return best[:, None, :]
+
+
+def _log_factorials(n: int) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, n + 1)))])
+
+
+def _capped_binomial(n: np.ndarray, p: np.ndarray, cap: np.ndarray, size: int,
+                     log_fact: np.ndarray) -> np.ndarray:
+    """P(min(Binomial(n, p), cap) = k) für k = 0..size-1; n, p, cap broadcastbar, k hinten angehängt."""
+    n, p, cap = (np.asarray(x)[..., None] for x in (n, p, cap))
+    k = np.arange(size)
+    possible = k <= n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_pmf = (
+            log_fact[n] - log_fact[np.minimum(k, n)] - log_fact[np.maximum(n - k, 0)]
+            + np.where(k > 0, k * np.log(p), 0.0)
+            + np.where(n - k > 0, (n - k) * np.log1p(-p), 0.0)
+        )
+    pmf = np.where(possible, np.exp(log_pmf), 0.0)
+    below = np.where(k < cap, pmf, 0.0)
+    # alles ab cap wird zu genau cap (kernels.fight: min(Treffer, Ziele))
+    return below + (k == cap) * np.maximum(0.0, 1.0 - below.sum(axis=-1, keepdims=True))
+
+
+def _best_response(cfg: kernels.MatchConfig) -> np.ndarray:
+    """Rückwärtsinduktion: Gegner-Wert V[schützen_ziel, gegner, spieler] (1 = Sieg, ½ = Remis).
+
+    Der Spieler hält seine Schützenzahl s (schießt also min(s, spieler)); für
+    s > spieler ist das dasselbe wie s = spieler, deshalb reichen die Zustände
+    mit s <= spieler. Zustände werden nach wachsenden Zahlen gelöst, jeder
+    hängt nur von kleineren ab – außer vom Stillstand (beide treffen nichts),
+    der über 1 / (1 - P(Stillstand)) herausgerechnet wird.
+    """
+    E, P = cfg.enemy_start, cfg.player_start
+    log_fact = _log_factorials(max(E * cfg.enemy_fp, P * cfg.player_fp, E, P))
+    value = np.zeros((P + 1, E + 1, P + 1))
+    value[:, 1:, 0] = 1.0   # Spieler ausgelöscht
+    value[:, 0, 0] = 0.5    # beide gleichzeitig
+    best = np.zeros((E + 1, P + 1, P + 1), dtype=np.uint16)
+    best[:, 0, :] = np.arange(E + 1)[:, None]  # Spieler schon ausgelöscht: egal, alle zeigen
+
+    for total_e in range(1, E + 1):
+        e = np.arange(_floor(total_e), total_e + 1)[None, :]
+        for total_p in range(1, P + 1):
+            s = np.arange(total_p + 1)[:, None]
+            p_hit_player, p_hit_enemy = _hit_chances(cfg, e, s)
+            kills_on_enemy = _capped_binomial(s * cfg.player_fp, p_hit_player, e, total_e + 1, log_fact)
+            kills_on_player = _capped_binomial(e * cfg.enemy_fp, p_hit_enemy, s, total_p + 1, log_fact)
+            # next_value[s, k1, k2] = V[s, total_e - k1, total_p - k2]
+            next_value = value[: total_p + 1, total_e::-1, total_p::-1]
+            expected = np.einsum(
+                "sek,sel,skl->se", kills_on_enemy, kills_on_player, next_value, optimize=True
+            )
+            stall = kills_on_enemy[..., 0] * kills_on_player[..., 0]
+            # value[s, total_e, total_p] ist noch 0 -> expected enthält den Stillstand nicht
+            with np.errstate(divide="ignore", invalid="ignore"):
+                options = np.where(stall < 1.0, expected / (1.0 - stall), 0.5)
+            # Gleichstand -> mehr zeigen (letztes Maximum)
+            pick = options.shape[1] - 1 - np.argmax(options[:, ::-1], axis=1)
+            value[: total_p + 1, total_e, total_p] = options[np.arange(total_p + 1), pick]
+            value[total_p + 1 :, total_e, total_p] = value[total_p, total_e, total_p]
+            best[total_e, total_p, : total_p + 1] = e[0, pick]
+            best[total_e, total_p, total_p + 1 :] = e[0, pick[-1]]
+    return best
+
+
+def build_table(behaviour: str, cfg: kernels.MatchConfig) -> np.ndarray:
+    """Tabelle gegner_schützen[gegner_gesamt, spieler_gesamt, spieler_schützen] (uint16)."""
+    if behaviour not in BEHAVIOURS:
+        raise ValueError(f"unbekanntes Gegner-Verhalten: {behaviour!r}")
+    if not supported(cfg):
+        raise ValueError(f"Gegner-Tabelle zu groß für {cfg.player_start} gegen {cfg.enemy_start} Soldaten")
+    E, P = cfg.enemy_start, cfg.player_start
+    shape = (E + 1, P + 1, P + 1)
+
+    if behaviour == "greedy":
+        table = np.arange(E + 1, dtype=np.uint16)[:, None, None]
+    elif behaviour == "cautious":
+        table = _cautious(cfg)
+    else:
+        table = _best_response(cfg)
+    return np.ascontiguousarray(np.broadcast_to(table, shape))
+
+
+def _load() -> dict[str, np.ndarray]:
+    global _tables
+    if _tables is None:
+        with _lock:
+            if _tables is None:
+                if os.path.exists(POLICY_FILE):
+                    with np.load(POLICY_FILE) as data:
+                        _tables = {k: data[k] for k in data.files}
+                else:
+                    _tables = {}
+    return _tables
+
+
+def is_standard(cfg: kernels.MatchConfig) -> bool:
+    """Gehört die Konfiguration (ohne Schützen-Ziel) zu einem Szenario der App?"""
+    return cfg._replace(target=0) in standard_configs()
+
+
+def _remember_custom(key: str, table: np.ndarray):
+    global _custom_bytes
+    with _lock:
+        if key in _custom or table.nbytes > CUSTOM_CACHE_BYTES:
+            return
+        _custom[key] = table
+        _custom_bytes += table.nbytes
+        while _custom_bytes > CUSTOM_CACHE_BYTES:
+            _, old = _custom.popitem(last=False)
+            _custom_bytes -= old.nbytes
+
+
+def table_for(behaviour: str, cfg: kernels.MatchConfig, allow_custom: bool = True) -> np.ndarray | None:
+    """Tabelle für Verhalten + Konfiguration; None = alle schießen (kein Lookup nötig).
+
+    allow_custom=False: nur Standard-Szenarien, sonst ValueError (für Dienste, bei
+    denen Fremde die Konfiguration bestimmen).
+    """
+    if behaviour == DEFAULT_BEHAVIOUR:
+        return None
+    if behaviour not in BEHAVIOURS:
+        raise ValueError(f"unbekanntes Gegner-Verhalten: {behaviour!r}")
+    tables = _load()
+    key = policy_key(behaviour, cfg)
+    standard = is_standard(cfg)
+    if not (standard or allow_custom or key in tables):
+        raise ValueError(f"Gegner-Verhalten {behaviour!r} gibt es nur für die Standard-Szenarien")
+    table = tables.get(key)
+    if table is None and not standard:
+        table = _cached_custom(key)
+    if table is not None:
+        return table
+
+    with _build_lock:
+        # nach dem Warten auf den Lock: vielleicht hat ein anderer Thread sie schon gebaut
+        table = tables.get(key) if standard else _cached_custom(key)
+        if table is None:
+            table = build_table(behaviour, cfg)
+            if standard:
+                with _lock:
+                    tables[key] = table
+            else:
+                _remember_custom(key, table)
+    return table
+
+
+def _cached_custom(key: str) -> np.ndarray | None:
+    with _lock:
+        table = _custom.get(key)
+        if table is not None:
+            _custom.move_to_end(key)
+        return table
+
+
+def preload() -> int:
+    """Lädt bzw. berechnet alle Standard-Tabellen einmal (beim Start). Rückgabe: Anzahl.
+
+    Konfigurationen, für die keine Tabelle passt (siehe supported), werden übersprungen.
+    """
+    for behaviour in BEHAVIOURS:
+        for cfg in standard_configs():
+            if supported(cfg):
+                table_for(behaviour, cfg)
+    return len(_load())
+
+
+def enemy_exposed(table: np.ndarray | None, enemy_total: int, player_total: int,
+                  player_exposed: int) -> int:
+    """Wie viele Gegner diese Runde schießen."""
+    if table is None:
+        return enemy_total
+    e = min(enemy_total, table.shape[0] - 1)
+    p = min(player_total, table.shape[1] - 1)
+    s = min(player_exposed, table.shape[2] - 1)
+    return min(int(table[e, p, s]), enemy_total)
+
+
+def standard_configs() -> list[kernels.MatchConfig]:
+    """Alle Konfigurationen, die die App spielt (Szenario 1, 2 und 3 je Armee)."""
+    cfgs = [config.match_config("Szenario 1", 0), config.match_config("Szenario 2", 0)]
+    cfgs += [config.match_config("Szenario 3", 0, army) for army in config.S3_ARMIES]
+    return cfgs
+
+
+def build_all(path: str = POLICY_FILE) -> int:
+    tables = {
+        policy_key(behaviour, cfg): build_table(behaviour, cfg)
+        for behaviour in BEHAVIOURS
+        if behaviour != DEFAULT_BEHAVIOUR
+        for cfg in standard_configs()
+    }
+    np.savez_compressed(path, **tables)
+    return len(tables)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zugspiel Gegner-Tabellen")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="Tabellen für alle Standard-Szenarien erzeugen")
+    p_build.add_argument("--out", default=POLICY_FILE)
+    args = parser.parse_args(argv)
+    print(f"{build_all(args.out)} Tabellen -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
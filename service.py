@@ -0,0 +1,366 @@
+"""
+ZUGSPIEL – SIMULATIONS-DIENST (JSON über HTTP, ohne Streamlit)
+
+Für Bewertungsskripte, Dashboards usw.:
+
+    POST /simulate
+        {"scenario": "Szenario 3", "army": "Miliz", "shooters": 50, "matches": 20000}
+        optional: "hit_chance", "enemy" (greedy | cautious | optimal), sowie jedes
+        Feld aus kernels.MatchConfig (player_start, enemy_start, player_fp,
+        enemy_fp, cross_n) zum Überschreiben; "cautious"/"optimal" nur für die
+        unveränderten Szenarien (Tabellen werden beim Start geladen)
+    -> {"win": 0.41, "loss": 0.57, "draw": 0.02, "mean_rounds": 11.3, "matches": 20000, ...}
+
+    GET /health
+
+Anfragen, die innerhalb weniger Millisekunden eintreffen, werden gesammelt
+und in EINEM Kernel-Aufruf gerechnet (gleiche Konfigurationen nur einmal).
+Schlägt eine Konfiguration fehl, bekommen nur ihre Anfragen den Fehler.
+Große Anfragen (Matches × Soldaten über LARGE_REQUEST_WORK) laufen auf einem
+eigenen Thread, damit sie die kleinen nicht aufhalten.
+Ergebnisse landen in einem begrenzten LRU-Cache; ein Treffer mit mindestens
+so vielen Matches wie angefragt wird direkt beantwortet.
+
+Start:
+    python service.py --port 8765
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+import kernels
+import policies
+
+BATCH_WINDOW_SECONDS = 0.005
+BATCH_MAX_REQUESTS = 256
+CACHE_SIZE = 4096
+DEFAULT_MATCHES = 10_000
+MAX_MATCHES = 200_000
+MAX_BATCH_MATCHES = 2_000_000  # Matches pro Kernel-Aufruf (Speichergrenze)
+MAX_SOLDIERS = 100_000
+MAX_FIREPOWER = 100
+MAX_ROUNDS = 500
+# Aufwand einer Anfrage ~ Matches × (Spieler + Gegner)
+MAX_REQUEST_WORK = 50_000_000
+LARGE_REQUEST_WORK = 5_000_000
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_BODY_BYTES = 64 * 1024
+
+
+# ============================================================
+# LRU-Cache
+# ============================================================
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, min_matches: int, count: bool = True):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None or value["matches"] < min_matches:
+                self.misses += count
+                return None
+            self._data.move_to_end(key)
+            self.hits += count
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            old = self._data.get(key)
+            if old is not None and old["matches"] > value["matches"]:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ============================================================
+# Micro-Batching
+# ============================================================
+def request_work(cfg: kernels.MatchConfig, matches: int) -> int:
+    return matches * (cfg.player_start + cfg.enemy_start)
+
+
+class MicroBatcher:
+    """Sammelt Anfragen für BATCH_WINDOW_SECONDS und rechnet sie gemeinsam."""
+
+    def __init__(self, cache: LRUCache):
+        self.cache = cache
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._large = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._loop, name="micro-batcher", daemon=True),
+            threading.Thread(target=self._large_loop, name="large-requests", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, cfg: kernels.MatchConfig, enemy: str, matches: int) -> Future:
+        fut = Future()
+        cached = self.cache.get((cfg, enemy), matches)
+        if cached is not None:
+            fut.set_result(cached)
+        elif request_work(cfg, matches) > LARGE_REQUEST_WORK:
+            self._large.put(((cfg, enemy), matches, fut))
+        else:
+            self._queue.put(((cfg, enemy), matches, fut))
+        return fut
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+        while len(batch) < BATCH_MAX_REQUESTS:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            self._run_safely(self._collect())
+
+    def _large_loop(self):
+        while True:
+            self._run_safely([self._large.get()])
+
+    def _run_safely(self, batch):
+        try:
+            self._run(batch)
+        except Exception as exc:  # nur Fehler außerhalb der Kernel-Aufrufe landen hier
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+
+    def _run(self, batch):
+        waiting: dict[tuple, list[Future]] = {}
+        needed: dict[tuple, int] = {}
+        for key, matches, fut in batch:
+            # kann inzwischen von einem früheren Batch beantwortet sein
+            cached = self.cache.get(key, matches, count=False)
+            if cached is not None:
+                fut.set_result(cached)
+                continue
+            waiting.setdefault(key, []).append(fut)
+            needed[key] = max(needed.get(key, 0), matches)
+
+        # Jede Konfiguration wird nur so oft gerechnet, wie ihre größte Anfrage verlangt
+        # (gleiche Konfiguration -> diese Anfrage hat request_work schon bestanden),
+        # nie auf die Matchzahl anderer Anfragen im Batch aufgefüllt.
+        # Standard-Gegner: ein Kernel-Aufruf pro Gruppe (Gruppen nur, damit der Speicher
+        # begrenzt bleibt). Andere Gegner brauchen ihre eigene Tabelle -> eigener Aufruf.
+        group, total = [], 0
+        for key in needed:
+            if key[1] != policies.DEFAULT_BEHAVIOUR:
+                self._settle([key], needed, waiting)
+                continue
+            if group and total + needed[key] > MAX_BATCH_MATCHES:
+                self._settle(group, needed, waiting)
+                group, total = [], 0
+            group.append(key)
+            total += needed[key]
+        if group:
+            self._settle(group, needed, waiting)
+
+    def _settle(self, keys, needed, waiting):
+        """Rechnet eine Gruppe; schlägt sie fehl, jede Konfiguration einzeln – der
+        Fehler geht nur an die Anfragen der Konfiguration, die ihn auslöst."""
+        try:
+            self._simulate(keys, needed, waiting)
+            return
+        except Exception as exc:
+            if len(keys) == 1:
+                for fut in waiting[keys[0]]:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                return
+        for key in keys:
+            self._settle([key], needed, waiting)
+
+    def _simulate(self, keys, needed, waiting):
+        configs = [cfg for cfg, _ in keys]
+        repeats = [needed[key] for key in keys]
+        # alle Schlüssel eines Aufrufs haben dasselbe Gegner-Verhalten
+        table = policies.table_for(keys[0][1], configs[0], allow_custom=False)
+        rounds, player_left, enemy_left = kernels.simulate_batch(configs, repeats, MAX_ROUNDS, table)
+        self.batches += 1
+
+        start = 0
+        for key, cfg, repeat in zip(keys, configs, repeats):
+            part = slice(start, start + repeat)
+            start += repeat
+            p, e = player_left[part], enemy_left[part]
+            wins = int(((p > 0) & (e <= 0)).sum())
+            losses = int(((e > 0) & (p <= 0)).sum())
+            result = {
+                "win": wins / repeat,
+                "loss": losses / repeat,
+                "draw": (repeat - wins - losses) / repeat,
+                "mean_rounds": float(rounds[part].mean()),
+                "mean_player_left": float(p.mean()),
+                "mean_enemy_left": float(e.mean()),
+                "matches": repeat,
+                "config": cfg._asdict(),
+                "enemy": key[1],
+            }
+            self.cache.put(key, result)
+            for fut in waiting[key]:
+                if not fut.done():
+                    fut.set_result(result)
+
+
+# ============================================================
+# Anfrage -> Konfiguration
+# ============================================================
+def _int(value, field: str) -> int:
+    try:
+        return int(value)
+    except OverflowError:  # JSON-Zahlen wie 1e400 kommen als inf an
+        raise ValueError(f"{field}: Zahl zu groß") from None
+
+
+def parse_request(body: dict) -> tuple[kernels.MatchConfig, str, int]:
+    scenario = body.get("scenario", "Szenario 2")
+    if scenario not in ("Szenario 1", "Szenario 2", "Szenario 3"):
+        raise ValueError(f"unbekanntes Szenario: {scenario!r}")
+
+    army = None
+    if scenario == "Szenario 3":
+        key = body.get("army", config.S3_ARMIES[0]["key"])
+        army = next((a for a in config.S3_ARMIES if a["key"] == key), None)
+        if army is None:
+            raise ValueError(f"unbekannte Armee: {key!r}")
+
+    hit_chance = float(body.get("hit_chance", config.HIT_CHANCE_S2))
+    if not 0.0 <= hit_chance <= 1.0:
+        raise ValueError("hit_chance muss zwischen 0 und 1 liegen")
+
+    cfg = config.match_config(scenario, 0, army, hit_chance)
+    overrides = {
+        field: _int(body[field], field)
+        for field in ("player_start", "enemy_start", "player_fp", "enemy_fp", "cross_n")
+        if field in body
+    }
+    cfg = cfg._replace(**overrides)
+    cfg = cfg._replace(target=_int(body.get("shooters", cfg.player_start), "shooters"))
+
+    if not (0 <= cfg.player_start <= MAX_SOLDIERS and 0 <= cfg.enemy_start <= MAX_SOLDIERS):
+        raise ValueError(f"Soldaten pro Seite: 0..{MAX_SOLDIERS}")
+    if not (0 <= cfg.player_fp <= MAX_FIREPOWER and 0 <= cfg.enemy_fp <= MAX_FIREPOWER):
+        raise ValueError(f"Feuerkraft: 0..{MAX_FIREPOWER}")
+    if not 0 <= cfg.cross_n <= MAX_SOLDIERS:
+        raise ValueError(f"cross_n: 0..{MAX_SOLDIERS}")
+    if not 0 <= cfg.target <= cfg.player_start:
+        raise ValueError(f"shooters: 0..{cfg.player_start}")
+
+    enemy = body.get("enemy", policies.DEFAULT_BEHAVIOUR)
+    if enemy not in policies.BEHAVIOURS:
+        raise ValueError(f"unbekanntes Gegner-Verhalten: {enemy!r}")
+    # Tabellen gibt es nur für die Standard-Szenarien (beim Start geladen) – beliebige
+    # Konfigurationen würden auf dem Batcher-Thread gerechnet und Speicher belegen
+    if enemy != policies.DEFAULT_BEHAVIOUR and not policies.is_standard(cfg):
+        raise ValueError(f"Gegner-Verhalten {enemy!r} gibt es nur für die Standard-Szenarien")
+
+    matches = _int(body.get("matches", DEFAULT_MATCHES), "matches")
+    if not 1 <= matches <= MAX_MATCHES:
+        raise ValueError(f"matches: 1..{MAX_MATCHES}")
+    if request_work(cfg, matches) > MAX_REQUEST_WORK:
+        raise ValueError(f"matches × (player_start + enemy_start) höchstens {MAX_REQUEST_WORK}")
+    return cfg, enemy, matches
+
+
+# ============================================================
+# HTTP
+# ============================================================
+class Handler(BaseHTTPRequestHandler):
+    batcher: MicroBatcher
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send(404, {"error": "not found"})
+            return
+        cache = self.batcher.cache
+        self._send(200, {
+            "status": "ok",
+            "backend": kernels.BACKEND,
+            "batches": self.batcher.batches,
+            "cache_entries": len(cache),
+            "cache_hits": cache.hits,
+            "cache_misses": cache.misses,
+        })
+
+    def do_POST(self):
+        if self.path != "/simulate":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._send(400, {"error": "ungültige Content-Length"})
+            return
+        if not 0 <= length <= MAX_BODY_BYTES:
+            self._send(413 if length > 0 else 400, {"error": f"Content-Length: 0..{MAX_BODY_BYTES}"})
+            return
+        try:
+            cfg, enemy, matches = parse_request(json.loads(self.rfile.read(length) or b"{}"))
+        except (ValueError, TypeError, AttributeError, OverflowError) as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        try:
+            result = self.batcher.submit(cfg, enemy, matches).result(timeout=REQUEST_TIMEOUT_SECONDS)
+        except Exception as exc:
+            self._send(500, {"error": repr(exc)})
+            return
+        self._send(200, result)
+
+    def log_message(self, format, *args):
+        pass  # kein Log pro Anfrage
+
+
+def serve(host: str, port: int):
+    kernels.warmup()
+    policies.preload()
+    Handler.batcher = MicroBatcher(LRUCache(CACHE_SIZE))
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"Zugspiel-Simulationsdienst auf http://{host}:{port} (Backend: {kernels.BACKEND})")
+    server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zugspiel Simulationsdienst")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
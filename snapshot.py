@@ -0,0 +1,355 @@
+"""
+ZUGSPIEL – SESSION-SNAPSHOTS (überlebt Neustart/Redeploy)
+
+Der Match-Zustand liegt in st.session_state und ist nach einem Neustart weg.
+Hier wird er kompakt in eine lokale SQLite-Datei gespiegelt, Schlüssel ist
+ein Session-Token (steht in der URL, ?sid=...).
+
+    match   Skalar-Zustand (Runde, Soldaten, Namen, Zähler ...) als kleiner
+            Binär-Blob, nur geschrieben wenn er sich geändert hat; die
+            Erklärungstexte (bis 64 KB) in einer eigenen Spalte, nur bei Änderung
+    armies  Detail-Modus-Armeen (Szenario 3): während ein Match läuft höchstens
+            alle ARMY_SNAPSHOT_SECONDS, sonst (Pause, Spielende) bei Änderung.
+            Beim Wiederherstellen werden die Zähler aus den Armeen abgeleitet.
+    log     Log-Feed, eine Zeile pro Eintrag – pro Tick werden nur die NEUEN
+            Zeilen eingefügt, nie der ganze Log neu geschrieben
+
+Gespeichert wird erst, wenn ein Match gestartet wurde (erste Log-Zeile);
+Sessions, die länger als SNAPSHOT_TTL_SECONDS nicht geschrieben wurden,
+werden regelmäßig gelöscht.
+"""
+
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+import soldiers
+
+SNAPSHOT_DB = os.environ.get("ZUGSPIEL_SNAPSHOT_DB", ".zugspiel_sessions.sqlite")
+SNAPSHOT_TTL_SECONDS = 7 * 24 * 3600
+PRUNE_INTERVAL_SECONDS = 600
+ARMY_SNAPSHOT_SECONDS = 10
+
+FORMAT_VERSION = 1
+
+# (Schlüssel in session_state, Typ) – Reihenfolge = Binärformat, nur hinten anhängen!
+FIELDS = [
+    ("page", "s"),
+    ("current_scenario", "s"),
+    ("games_played_s1", "i"),
+    ("games_played_s2", "i"),
+    ("games_played_s3", "i"),
+    ("explanation_text_s1", "s"),
+    ("explanation_text_s2", "s"),
+    ("player_name", "s"),
+    ("enemy_name", "s"),
+    ("bg_file", "s"),
+    ("s3_army_key", "s"),
+    ("s3_army_soldiers", "i"),
+    ("s3_army_firepower", "i"),
+    ("s3_army_veterans", "f"),
+    ("s3_detailed", "b"),
+    ("running", "b"),
+    ("game_over", "b"),
+    ("round", "i"),
+    ("player_cover", "i"),
+    ("player_shooters", "i"),
+    ("enemy_shooters", "i"),
+    ("winner", "s"),
+    ("log_seq", "i"),
+    ("enemy_cover", "i"),
+    ("enemy_behaviour", "s"),
+]
+
+# Freitexte: eigene Spalte statt im Match-Blob (im Blob immer None)
+TEXT_FIELDS = ("explanation_text_s1", "explanation_text_s2")
+
+_NONE_INT = -(2**31)
+_NONE_STR = 0xFFFF
+_NONE_BOOL = 2
+
+
+# ============================================================
+# Binärformat
+# ============================================================
+def _pack_str(value) -> bytes:
+    if value is None:
+        return struct.pack("<H", _NONE_STR)
+    # auf Zeichengrenze kürzen, damit kein UTF-8-Zeichen zerschnitten wird
+    raw = str(value).encode()[: _NONE_STR - 1].decode("utf-8", "ignore").encode()
+    return struct.pack("<H", len(raw)) + raw
+
+
+def _unpack_str(blob: bytes, offset: int) -> tuple[str | None, int]:
+    (length,) = struct.unpack_from("<H", blob, offset)
+    offset += 2
+    if length == _NONE_STR:
+        return None, offset
+    return blob[offset : offset + length].decode(), offset + length
+
+
+def encode(state) -> bytes:
+    parts = [struct.pack("<B", FORMAT_VERSION)]
+    for key, kind in FIELDS:
+        value = None if key in TEXT_FIELDS else state.get(key)
+        if kind == "i":
+            parts.append(struct.pack("<i", _NONE_INT if value is None else int(value)))
+        elif kind == "f":
+            parts.append(struct.pack("<d", float("nan") if value is None else float(value)))
+        elif kind == "b":
+            parts.append(struct.pack("<B", _NONE_BOOL if value is None else int(bool(value))))
+        else:
+            parts.append(_pack_str(value))
+    return b"".join(parts)
+
+
+def decode(blob: bytes) -> dict:
+    if not blob or blob[0] != FORMAT_VERSION:
+        return {}
+    out = {}
+    offset = 1
+    for key, kind in FIELDS:
+        if offset >= len(blob):
+            break
+        if kind == "i":
+            (value,) = struct.unpack_from("<i", blob, offset)
+            offset += 4
+            out[key] = None if value == _NONE_INT else value
+        elif kind == "f":
+            (value,) = struct.unpack_from("<d", blob, offset)
+            offset += 8
+            out[key] = None if value != value else value
+        elif kind == "b":
+            value = blob[offset]
+            offset += 1
+            out[key] = None if value == _NONE_BOOL else bool(value)
+        else:
+            out[key], offset = _unpack_str(blob, offset)
+    return out
+
+
+def encode_texts(state) -> bytes:
+    return b"".join(_pack_str(state.get(key)) for key in TEXT_FIELDS)
+
+
+def decode_texts(blob: bytes) -> dict:
+    out = {}
+    offset = 0
+    for key in TEXT_FIELDS:
+        if offset >= len(blob):
+            break
+        out[key], offset = _unpack_str(blob, offset)
+    return out
+
+
+def encode_armies(state) -> bytes:
+    player = state.get("s3_player_army")
+    enemy = state.get("s3_enemy_army")
+    if player is None or enemy is None:
+        return b""
+    p = soldiers.to_bytes(player)
+    return zlib.compress(len(p).to_bytes(4, "little") + p + soldiers.to_bytes(enemy), 1)
+
+
+def decode_armies(blob: bytes):
+    if not blob:
+        return None, None
+    raw = zlib.decompress(blob)
+    split = 4 + int.from_bytes(raw[:4], "little")
+    return soldiers.from_bytes(raw[4:split]), soldiers.from_bytes(raw[split:])
+
+
+# ============================================================
+# Store
+# ============================================================
+class SnapshotStore:
+    def __init__(self, path: str = SNAPSHOT_DB, ttl_seconds: float = SNAPSHOT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS match ("
+            " token TEXT PRIMARY KEY, state BLOB, armies BLOB, updated REAL NOT NULL DEFAULT 0,"
+            " texts BLOB NOT NULL DEFAULT x''"
+            ")"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(match)")}
+        if "updated" not in columns:  # Datei aus einer Version ohne TTL
+            self._db.execute("ALTER TABLE match ADD COLUMN updated REAL NOT NULL DEFAULT 0")
+            self._db.execute("UPDATE match SET updated = ?", (time.time(),))
+        if "texts" not in columns:  # Datei aus einer Version mit Texten im Match-Blob
+            self._db.execute("ALTER TABLE match ADD COLUMN texts BLOB NOT NULL DEFAULT x''")
+        self._db.execute("CREATE INDEX IF NOT EXISTS match_updated ON match (updated)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS log ("
+            " token TEXT, seq INTEGER, line TEXT, PRIMARY KEY (token, seq)"
+            ") WITHOUT ROWID"
+        )
+        self._next_prune = 0.0
+        self.prune()
+
+    def prune(self, now: float | None = None) -> int:
+        """Löscht Sessions, die länger als ttl_seconds nicht geschrieben wurden. Rückgabe: Anzahl."""
+        now = time.time() if now is None else now
+        cutoff = now - self.ttl_seconds
+        with self._lock:
+            self._next_prune = now + PRUNE_INTERVAL_SECONDS
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    "DELETE FROM log WHERE token IN (SELECT token FROM match WHERE updated < ?)",
+                    (cutoff,),
+                )
+                removed = self._db.execute("DELETE FROM match WHERE updated < ?", (cutoff,)).rowcount
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return removed
+
+    def write(self, token: str, state_blob: bytes | None, armies_blob: bytes | None,
+              new_lines: list[tuple[int, str]], log_floor: int, texts_blob: bytes | None = None):
+        """Schreibt nur, was übergeben wird (None = unverändert). Log-Zeilen <= log_floor fliegen raus."""
+        now = time.time()
+        if now >= self._next_prune:
+            self.prune(now)
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    "INSERT INTO match (token, state, armies, updated) VALUES (?, x'', x'', ?) "
+                    "ON CONFLICT (token) DO UPDATE SET updated = excluded.updated",
+                    (token, now),
+                )
+                if state_blob is not None:
+                    self._db.execute("UPDATE match SET state = ? WHERE token = ?", (state_blob, token))
+                if armies_blob is not None:
+                    self._db.execute("UPDATE match SET armies = ? WHERE token = ?", (armies_blob, token))
+                if texts_blob is not None:
+                    self._db.execute("UPDATE match SET texts = ? WHERE token = ?", (texts_blob, token))
+                self._db.execute("DELETE FROM log WHERE token = ? AND seq <= ?", (token, log_floor))
+                if new_lines:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO log (token, seq, line) VALUES (?, ?, ?)",
+                        [(token, seq, line) for seq, line in new_lines],
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def read(self, token: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state, armies, texts FROM match WHERE token = ?", (token,)
+            ).fetchone()
+            if row is None:
+                return None
+            lines = [
+                line
+                for (line,) in self._db.execute(
+                    "SELECT line FROM log WHERE token = ? ORDER BY seq", (token,)
+                )
+            ]
+        return row[0], row[1], row[2], lines
+
+
+# ============================================================
+# session_state <-> Store
+# ============================================================
+def save(store: SnapshotStore, token: str, state, now: float | None = None):
+    """Spiegelt den Zustand in den Store, schreibt aber nur geänderte Teile.
+
+    Vor dem ersten Start eines Matches (noch keine Log-Zeile) wird nichts gespeichert.
+    """
+    if not state.get("log_seq"):
+        return
+    now = time.time() if now is None else now
+    cursor = state.get("_snapshot_cursor") or {}
+    cursor = {"state": None, "armies": None, "armies_at": 0.0, "texts": None, "log_seq": 0, **cursor}
+
+    state_blob = encode(state)
+    texts = tuple(state.get(key) for key in TEXT_FIELDS)
+    texts_changed = texts != cursor["texts"]
+    if not state.get("s3_detailed"):
+        armies_blob = b""
+    elif not state.get("running") or now - cursor["armies_at"] >= ARMY_SNAPSHOT_SECONDS:
+        armies_blob = encode_armies(state)
+    else:
+        armies_blob = cursor["armies"]  # läuft: Armeen erst später wieder kodieren
+
+    log = state.get("log") or []
+    log_seq = int(state.get("log_seq") or 0)
+    log_floor = log_seq - len(log)
+    first_new = max(cursor["log_seq"], log_floor)
+    new_lines = [(seq, log[seq - log_floor - 1]) for seq in range(first_new + 1, log_seq + 1)]
+
+    state_changed = state_blob != cursor["state"]
+    armies_changed = armies_blob != cursor["armies"]
+    if not (state_changed or armies_changed or texts_changed or new_lines):
+        return
+
+    store.write(
+        token,
+        state_blob if state_changed else None,
+        armies_blob if armies_changed else None,
+        new_lines,
+        log_floor,
+        encode_texts(state) if texts_changed else None,
+    )
+    state["_snapshot_cursor"] = {
+        "state": state_blob,
+        "armies": armies_blob,
+        "armies_at": now if armies_changed else cursor["armies_at"],
+        "texts": texts,
+        "log_seq": log_seq,
+    }
+
+
+def restore(store: SnapshotStore, token: str, state, allowed: dict[str, set] | None = None) -> bool:
+    """Lädt einen gespeicherten Zustand in session_state.
+
+    allowed: erlaubte Werte je Schlüssel; andere Werte werden verworfen (dann greifen
+    die Standardwerte der App). False, wenn nichts da ist oder der Snapshot kaputt ist.
+    """
+    row = store.read(token)
+    if row is None:
+        return False
+    state_blob, armies_blob, texts_blob, lines = row
+    try:
+        values = decode(state_blob)
+        texts = decode_texts(texts_blob)
+        # ältere Snapshots haben die Texte noch im Match-Blob
+        values.update({k: v for k, v in texts.items() if v is not None})
+        player_army, enemy_army = decode_armies(armies_blob)
+    except (UnicodeDecodeError, struct.error, zlib.error, ValueError):
+        return False
+    if not values:
+        return False
+    if player_army is not None and enemy_army is not None:
+        # Armeen können etwas älter sein als der Match-Blob -> Zähler passend dazu
+        values["player_shooters"] = soldiers.exposed_count(player_army)
+        values["player_cover"] = soldiers.alive_count(player_army) - values["player_shooters"]
+        values["enemy_shooters"] = soldiers.exposed_count(enemy_army)
+        values["enemy_cover"] = soldiers.alive_count(enemy_army) - values["enemy_shooters"]
+
+    for key, options in (allowed or {}).items():
+        if key in values and values[key] not in options:
+            del values[key]
+    for key, value in values.items():
+        state[key] = value
+    state["s3_player_army"], state["s3_enemy_army"] = player_army, enemy_army
+    state["log"] = lines
+    state["_snapshot_cursor"] = {
+        "state": state_blob,
+        "armies": armies_blob or b"",
+        "armies_at": 0.0,
+        "texts": tuple(texts.get(key) for key in TEXT_FIELDS),  # so wie in der Spalte
+        "log_seq": int(values.get("log_seq") or 0),
+    }
+    return True
@@ -0,0 +1,134 @@
+"""
+ZUGSPIEL – DETAIL-MODUS (jeder Soldat einzeln)
+
+Im normalen Modus sind Soldaten austauschbare Zähler (player_shooters,
+player_cover, enemy_shooters). Im Detail-Modus hat jeder Soldat eigene Werte:
+
+    accuracy   Trefferchance pro Schuss (Grundwert)
+    firepower  Schüsse pro Runde
+    morale     Moral 0..1, multipliziert die Trefferchance
+
+Speicherung als Struct-of-Arrays: pro Eigenschaft EIN zusammenhängendes
+NumPy-Array, Index i = Soldat i. Keine Dicts/Objekte pro Soldat – Zielwahl
+und Verlustberechnung laufen vektorisiert über die ganze Armee, damit auch
+Armeen mit tausenden Soldaten in den 100-ms-Tick passen.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+# Moralverlust: Anteil der Armee, der in einer Runde fällt, * MORALE_SHOCK
+MORALE_SHOCK = 0.5
+MORALE_FLOOR = 0.3
+
+_rng = np.random.default_rng()
+
+
+class Army(NamedTuple):
+    accuracy: np.ndarray   # float32
+    firepower: np.ndarray  # int32
+    morale: np.ndarray     # float32
+    alive: np.ndarray      # bool
+    exposed: np.ndarray    # bool – schießt diese Runde (und ist sichtbar)
+
+
+def build_army(soldiers: int, firepower: int, veteran_share: float, profiles: dict) -> Army:
+    """Erzeugt eine Armee aus Veteranen und Rekruten (profiles: "Veteran"/"Rekrut")."""
+    n = max(0, int(soldiers))
+    n_vet = int(round(n * min(1.0, max(0.0, veteran_share))))
+    is_vet = np.zeros(n, dtype=bool)
+    is_vet[:n_vet] = True
+
+    vet, rec = profiles["Veteran"], profiles["Rekrut"]
+    accuracy = np.where(is_vet, vet["accuracy"], rec["accuracy"]).astype(np.float32)
+    morale = np.where(is_vet, vet["morale"], rec["morale"]).astype(np.float32)
+
+    return Army(
+        accuracy=accuracy,
+        firepower=np.full(n, int(firepower), dtype=np.int32),
+        morale=morale,
+        alive=np.ones(n, dtype=bool),
+        exposed=np.ones(n, dtype=bool),
+    )
+
+
+def alive_count(army: Army) -> int:
+    return int(np.count_nonzero(army.alive))
+
+
+def exposed_count(army: Army) -> int:
+    return int(np.count_nonzero(army.alive & army.exposed))
+
+
+def mean_morale(army: Army) -> float:
+    if not army.alive.any():
+        return 0.0
+    return float(army.morale[army.alive].mean())
+
+
+def deploy(army: Army, shooters: int) -> int:
+    """Die `shooters` treffsichersten lebenden Soldaten schießen, der Rest geht in Deckung."""
+    army.exposed[:] = False
+    alive_idx = np.flatnonzero(army.alive)
+    k = max(0, min(int(shooters), alive_idx.size))
+    if k:
+        skill = army.accuracy[alive_idx] * army.morale[alive_idx]
+        best = alive_idx[np.argsort(-skill, kind="stable")[:k]]
+        army.exposed[best] = True
+    return k
+
+
+def fire(army: Army) -> int:
+    """Anzahl Treffer aller exponierten Schützen (je Soldat firepower Schüsse)."""
+    idx = np.flatnonzero(army.alive & army.exposed)
+    if idx.size == 0:
+        return 0
+    p_hit = np.clip(army.accuracy[idx] * army.morale[idx], 0.0, 1.0)
+    return int(_rng.binomial(army.firepower[idx], p_hit).sum())
+
+
+def apply_hits(army: Army, hits: int) -> int:
+    """Verteilt Treffer zufällig auf exponierte Soldaten (ein Treffer = ein Ausfall)."""
+    alive_before = alive_count(army)
+    targets = np.flatnonzero(army.alive & army.exposed)
+    kills = min(int(hits), targets.size)
+    if kills == 0:
+        return 0
+
+    victims = _rng.choice(targets, size=kills, replace=False)
+    army.alive[victims] = False
+    army.exposed[victims] = False
+
+    shock = MORALE_SHOCK * kills / max(1, alive_before)
+    survivors = army.alive
+    army.morale[survivors] = np.clip(army.morale[survivors] - shock, MORALE_FLOOR, 1.0)
+    return kills
+
+
+def resolve_round(player: Army, enemy: Army) -> tuple[int, int]:
+    """Eine Runde: beide Seiten feuern gleichzeitig, dann werden Verluste angewendet."""
+    hits_on_enemy = fire(player)
+    hits_on_player = fire(enemy)
+    kills_on_enemy = apply_hits(enemy, hits_on_enemy)
+    kills_on_player = apply_hits(player, hits_on_player)
+    return kills_on_enemy, kills_on_player
+
+
+def to_bytes(army: Army) -> bytes:
+    """Kompakte Binärform: Anzahl Soldaten, dann die Arrays roh hintereinander."""
+    n = army.alive.size
+    return n.to_bytes(4, "little") + b"".join(
+        np.ascontiguousarray(col).tobytes() for col in army
+    )
+
+
+def from_bytes(blob: bytes) -> Army:
+    n = int.from_bytes(blob[:4], "little")
+    offset = 4
+    cols = []
+    for dtype in (np.float32, np.int32, np.float32, np.bool_, np.bool_):
+        size = n * np.dtype(dtype).itemsize
+        cols.append(np.frombuffer(blob, dtype=dtype, count=n, offset=offset).copy())
+        offset += size
+    return Army(*cols)
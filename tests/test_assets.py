@@ -0,0 +1,92 @@
+import base64
+import io
+
+import pytest
+
+import assets
+
+
+def _png(path, size=(40, 20), mode="RGB", color=(200, 30, 30)):
+    from PIL import Image
+    Image.new(mode, size, color).save(path, format="PNG")
+    return str(path)
+
+
+def _fake_png(path, payload=b"x" * 100):
+    path.write_bytes(assets.PNG_SIGNATURE + payload)
+    return str(path)
+
+
+@pytest.fixture
+def no_pillow(monkeypatch):
+    monkeypatch.setattr(assets, "Image", None)
+
+
+def test_scan_keeps_only_readable_pngs(tmp_path):
+    good = _fake_png(tmp_path / "a.png")
+    jpeg = tmp_path / "b.png"
+    jpeg.write_bytes(b"\xff\xd8\xff" + b"0" * 20)
+    manager = assets.AssetManager([good, str(jpeg), str(tmp_path / "fehlt.png"), good])
+    assert manager.valid == {good}
+    assert manager.available([str(jpeg), good]) == [good]
+    assert manager.data_uri(str(jpeg)) == ""
+
+
+def test_cache_counts_hits_and_evicts_by_bytes(tmp_path, no_pillow):
+    paths = [_fake_png(tmp_path / f"{i}.png") for i in range(3)]
+    one = len("data:image/png;base64,") + len(base64.b64encode(assets.PNG_SIGNATURE + b"x" * 100))
+    manager = assets.AssetManager(paths, max_bytes=2 * one)
+
+    first = manager.data_uri(paths[0])
+    assert first.startswith("data:image/png;base64,")
+    assert manager.data_uri(paths[0], "mobile") is first  # ohne Pillow nur eine Variante
+    manager.data_uri(paths[1])
+    manager.data_uri(paths[2])  # verdrängt paths[0]
+
+    stats = manager.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 2 * one and stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+    assert stats["hit_rate"] == pytest.approx(0.25)
+
+
+def test_file_removed_after_scan_returns_empty_and_is_dropped(tmp_path, no_pillow):
+    path = _fake_png(tmp_path / "a.png")
+    manager = assets.AssetManager([path])
+    (tmp_path / "a.png").unlink()
+    assert manager.data_uri(path) == ""
+    assert manager.available([path]) == []
+
+
+def test_file_replaced_by_non_png_after_scan(tmp_path, no_pillow):
+    path = _fake_png(tmp_path / "a.png")
+    manager = assets.AssetManager([path])
+    (tmp_path / "a.png").write_bytes(b"kaputt")
+    assert manager.data_uri(path) == ""
+    assert path not in manager.valid
+
+
+def _decode(uri):
+    from PIL import Image
+    header, data = uri.split(",", 1)
+    return header, Image.open(io.BytesIO(base64.b64decode(data)))
+
+
+def test_pillow_downscales_and_keeps_transparency(tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setitem(assets.VIEWPORTS, "mobile", 16)
+    opaque = _png(tmp_path / "rgb.png")
+    clear = _png(tmp_path / "rgba.png", mode="RGBA", color=(0, 0, 0, 0))
+    manager = assets.AssetManager([opaque, clear])
+
+    header, img = _decode(manager.data_uri(opaque, "mobile"))
+    assert header == "data:image/jpeg;base64" and img.size == (16, 8)
+    header, img = _decode(manager.data_uri(clear, "mobile"))
+    assert header == "data:image/png;base64" and img.mode == "RGBA" and img.size == (16, 8)
+
+
+def test_broken_png_with_valid_signature_is_dropped(tmp_path):
+    pytest.importorskip("PIL")
+    path = _fake_png(tmp_path / "a.png")  # Signatur stimmt, Inhalt nicht
+    manager = assets.AssetManager([path])
+    assert manager.data_uri(path, "mobile") == ""
+    assert path not in manager.valid
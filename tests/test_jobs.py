@@ -0,0 +1,99 @@
+import argparse
+
+import pytest
+
+import jobs
+
+
+def _queue(tmp_path, name, matches=120):
+    db = jobs.connect(str(tmp_path / name))
+    assert jobs.enqueue(db, "Szenario 2", [0.1], [1.0], matches) == 1
+    return db
+
+
+def _counts(db):
+    return db.execute(
+        "SELECT status, done_matches, wins, losses, draws, rounds_sum FROM items"
+    ).fetchone()
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    db = _queue(tmp_path, "q.sqlite")
+    assert jobs.enqueue(db, "Szenario 2", [0.1], [1.0], 120) == 0
+
+
+def test_work_finishes_all_items(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "CHUNK_MATCHES", 50)
+    db = _queue(tmp_path, "q.sqlite")
+    assert jobs.work(str(tmp_path / "q.sqlite"), "w1") == 1
+    status, done, wins, losses, draws, _ = _counts(db)
+    assert status == "done" and done == 120 and wins + losses + draws == 120
+    assert jobs.progress(db)["items"] == {"done": 1}
+
+
+def test_expired_lease_resumes_at_checkpoint_without_double_counting(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "CHUNK_MATCHES", 50)
+    reference = _queue(tmp_path, "ref.sqlite")
+    jobs.work(str(tmp_path / "ref.sqlite"), "ref")
+
+    db = _queue(tmp_path, "q.sqlite")
+    stale = jobs._claim(db, "A")
+    # Worker A hängt: Lease läuft ab, B übernimmt und rechnet alles
+    db.execute("UPDATE items SET lease_until = 0")
+    assert jobs.work(str(tmp_path / "q.sqlite"), "B") == 1
+
+    # A wacht auf und will seinen Block committen -> wird verworfen
+    assert jobs._run_item(db, "A", stale) is False
+    # feste Seeds pro Block: gleiches Ergebnis wie ohne Unterbrechung
+    assert _counts(db) == _counts(reference)
+
+
+def test_partial_checkpoint_is_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "CHUNK_MATCHES", 50)
+    reference = _queue(tmp_path, "ref.sqlite")
+    jobs.work(str(tmp_path / "ref.sqlite"), "ref")
+
+    db = _queue(tmp_path, "q.sqlite")
+    row = jobs._claim(db, "A")
+    item_id, key, params, _, done = row
+    # A schafft nur den ersten Block, dann Absturz
+    jobs._run_item(db, "A", (item_id, key, params, 50, done))
+    assert _counts(db)[1] == 50
+    db.execute("UPDATE items SET lease_until = 0")
+    jobs.work(str(tmp_path / "q.sqlite"), "B")
+    assert _counts(db) == _counts(reference)
+
+
+def test_expired_lease_after_max_attempts_is_marked_failed(tmp_path):
+    db = _queue(tmp_path, "q.sqlite")
+    db.execute(
+        "UPDATE items SET status = 'running', worker = 'dead', lease_until = 0, attempts = ?",
+        (jobs.MAX_ATTEMPTS,),
+    )
+    assert jobs._claim(db, "B") is None
+    assert _counts(db)[0] == "failed"
+    assert jobs.retry_failed(db) == 1
+    assert jobs._claim(db, "B") is not None
+
+
+def test_grid_ranges_and_lists():
+    assert jobs._grid("0.05:0.2:0.05") == [0.05, 0.1, 0.15, 0.2]
+    assert jobs._grid("0:0.26:0.1") == [0.0, 0.1, 0.2]  # hi wird nie überschritten
+    assert jobs._grid("0.3:0.3:0.1") == [0.3]
+    assert jobs._grid("0.1,0.3") == [0.1, 0.3]
+
+
+@pytest.mark.parametrize("spec", [
+    "0.1:0.2:0", "0.1:0.2:-0.05", "0.2:0.1:0.05", "0:1:1e-9", "0:inf:0.1", "nan:1:0.1",
+    "0.1:0.2", "a,b", "0.5,1.5", "", "0.1,nan",
+])
+def test_grid_rejects_bad_specs(spec):
+    with pytest.raises(argparse.ArgumentTypeError):
+        jobs._grid(spec)
+
+
+def test_bad_grid_is_an_argparse_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        jobs.main(["enqueue", str(tmp_path / "q.sqlite"), "--hit-chances", "0.1:0.2:0"])
+    assert exc.value.code == 2
+    assert "step muss > 0 sein" in capsys.readouterr().err
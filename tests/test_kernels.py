@@ -0,0 +1,122 @@
+import random
+
+import numpy as np
+import pytest
+
+import kernels
+
+JITTED = ("_hits", "fight", "_simulate", "_seed")
+S2 = kernels.MatchConfig(kernels.MODE_CONSTANT, 0.1, 0, 1, 1, 50, 30, 50)
+S1 = kernels.MatchConfig(kernels.MODE_CROSS_SECTION, 0.0, 40, 1, 1, 50, 30, 25)
+
+
+@pytest.fixture(params=["python", "numba"])
+def backend(request, monkeypatch):
+    if request.param == "numba":
+        if kernels.BACKEND != "numba":
+            pytest.skip("Numba nicht installiert")
+    else:
+        for name in JITTED:
+            fn = getattr(kernels, name)
+            monkeypatch.setattr(kernels, name, getattr(fn, "py_func", fn))
+        monkeypatch.setattr(kernels, "BACKEND", "python")
+    return request.param
+
+
+def _per_shot(mode, shooters, enemy_exposed, p_hit, cross_n, player_fp, enemy_fp):
+    """Alte Logik aus app.py: jeder Schuss einzeln gewürfelt."""
+    if mode == kernels.MODE_CROSS_SECTION:
+        p_player = min(1.0, enemy_exposed / max(1, cross_n))
+        p_enemy = min(1.0, shooters / max(1, cross_n))
+    else:
+        p_player = p_enemy = p_hit
+    kills_on_enemy = min(sum(random.random() < p_player for _ in range(shooters * player_fp)), enemy_exposed)
+    kills_on_player = min(sum(random.random() < p_enemy for _ in range(enemy_exposed * enemy_fp)), shooters)
+    return kills_on_enemy, kills_on_player
+
+
+@pytest.mark.parametrize("args", [
+    (kernels.MODE_CONSTANT, 30, 20, 0.1, 0, 1, 1),
+    (kernels.MODE_CONSTANT, 35, 45, 0.1, 0, 3, 2),
+    (kernels.MODE_CROSS_SECTION, 25, 30, 0.0, 40, 1, 1),
+])
+def test_fight_matches_per_shot_logic(backend, args):
+    kernels.seed(3)
+    random.seed(3)
+    n = 4000
+    new = np.array([kernels.fight(*args) for _ in range(n)])
+    old = np.array([_per_shot(*args) for _ in range(n)])
+    # gleiche Verteilung: Mittelwerte auf ein paar Standardfehler gleich
+    tolerance = 4 * np.sqrt(new.var(axis=0) / n + old.var(axis=0) / n) + 1e-9
+    assert (np.abs(new.mean(axis=0) - old.mean(axis=0)) <= tolerance).all()
+
+
+def test_fight_caps_kills_at_exposed_targets(backend):
+    assert kernels.fight(kernels.MODE_CONSTANT, 10, 3, 1.0, 0, 5, 5) == (3, 10)
+    assert kernels.fight(kernels.MODE_CONSTANT, 0, 3, 1.0, 0, 5, 5) == (0, 0)
+    assert kernels.fight(kernels.MODE_CONSTANT, 10, 3, 0.0, 0, 5, 5) == (0, 0)
+
+
+def test_simulate_batch_layout_is_contiguous_per_config(backend):
+    decided = S2._replace(player_start=0)
+    rounds, player_left, enemy_left = kernels.simulate_batch([S1, decided, S2], [5, 3, 4])
+    assert rounds.shape == player_left.shape == enemy_left.shape == (12,)
+    # Spieler ohne Soldaten: Match ist vor der ersten Runde vorbei
+    assert (rounds[5:8] == 0).all() and (player_left[5:8] == 0).all() and (enemy_left[5:8] == 30).all()
+    assert (rounds[:5] > 0).all() and (rounds[8:] > 0).all()
+    ended = (player_left <= 0) | (enemy_left <= 0)
+    assert ended.all()
+
+
+def test_seed_makes_runs_reproducible(backend):
+    kernels.seed(42)
+    first = kernels.simulate_batch([S1, S2], 200)
+    kernels.seed(42)
+    second = kernels.simulate_batch([S1, S2], 200)
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_policy_table_controls_enemy_exposure(backend):
+    # Gegner zeigt nie jemanden: niemand kann treffen -> Stillstand bis max_rounds
+    hidden = np.zeros((31, 51, 51), dtype=np.uint16)
+    rounds, player_left, enemy_left = kernels.simulate_batch([S2], 10, 25, hidden)
+    assert (rounds == 25).all() and (player_left == 50).all() and (enemy_left == 30).all()
+
+
+def test_trajectories_hold_final_state(backend):
+    kernels.seed(1)
+    player_traj, enemy_traj = kernels.simulate_trajectories(S2, 50, 200)
+    assert player_traj.shape == enemy_traj.shape == (50, 201)
+    assert (player_traj[:, 0] == 50).all() and (enemy_traj[:, 0] == 30).all()
+    assert (np.diff(player_traj, axis=1) <= 0).all() and (np.diff(enemy_traj, axis=1) <= 0).all()
+    assert ((player_traj[:, -1] <= 0) | (enemy_traj[:, -1] <= 0)).all()
+
+
+class _BrokenJit:
+    """Tut so, als wäre es eine njit-Funktion, deren Kompilierung fehlschlägt."""
+
+    def __init__(self, fn):
+        self.py_func = fn
+
+    def __call__(self, *args):
+        raise RuntimeError("Kompilierung fehlgeschlagen")
+
+
+def test_warmup_falls_back_to_python_when_compiling_fails(monkeypatch):
+    for name in JITTED:
+        fn = getattr(kernels, name)
+        monkeypatch.setattr(kernels, name, _BrokenJit(getattr(fn, "py_func", fn)))
+    monkeypatch.setattr(kernels, "BACKEND", "numba")
+    assert kernels.warmup() == "python"
+    assert not isinstance(kernels.fight, _BrokenJit)
+    kernels.seed(0)
+    rounds, _, _ = kernels.simulate_batch([S2], 3)
+    assert rounds.shape == (3,)
+
+
+def test_warmup_errors_on_python_backend_are_not_hidden(monkeypatch):
+    monkeypatch.setattr(kernels, "BACKEND", "python")
+    monkeypatch.setattr(kernels, "fight", _BrokenJit(kernels.fight))
+    with pytest.raises(RuntimeError):
+        kernels.warmup()
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import config
+import kernels
+import policies
+
+SMALL = kernels.MatchConfig(kernels.MODE_CONSTANT, 0.3, 0, 1, 1, 6, 5, 0)
+
+
+def test_policy_key_uses_exact_hit_chance():
+    cfg = config.match_config("Szenario 2", 0)
+    assert policies.policy_key("optimal", cfg) != policies.policy_key("optimal", cfg._replace(p_hit=0.10001))
+
+
+def test_tables_respect_floor_and_enemy_total():
+    for behaviour in policies.BEHAVIOURS:
+        table = policies.build_table(behaviour, SMALL)
+        assert table.dtype == np.uint16 and table.shape == (6, 7, 7)
+        for total in range(6):
+            assert (table[total] <= total).all()
+            assert (table[total] >= np.ceil(policies.MIN_EXPOSED_SHARE * total)).all()
+
+
+def test_enemy_count_beyond_uint16_is_rejected():
+    cfg = SMALL._replace(enemy_start=policies.MAX_TABLE_ENEMY + 1, player_start=1)
+    with pytest.raises(ValueError):
+        policies.build_table("cautious", cfg)
+
+
+def test_custom_configs_only_when_allowed():
+    assert policies.table_for("greedy", SMALL, allow_custom=False) is None
+    with pytest.raises(ValueError):
+        policies.table_for("optimal", SMALL, allow_custom=False)
+    assert policies.table_for("optimal", SMALL).shape == (6, 7, 7)
+
+
+def _enemy_score(cfg, table, matches=20_000):
+    kernels.seed(7)
+    _, player_left, enemy_left = kernels.simulate_batch([cfg], matches, 500, table)
+    wins = ((enemy_left > 0) & (player_left <= 0)).mean()
+    draws = ((enemy_left > 0) == (player_left > 0)).mean()
+    return wins + 0.5 * draws
+
+
+@pytest.mark.parametrize("target", [2, 6])
+def test_best_response_is_at_least_as_good_as_other_behaviours(target):
+    cfg = config.match_config("Szenario 1", target)._replace(player_start=12, enemy_start=8, cross_n=10)
+    best = _enemy_score(cfg, policies.build_table("optimal", cfg))
+    for behaviour in ("greedy", "cautious"):
+        # Monte-Carlo-Rauschen: knapp 3 Standardabweichungen bei 20 000 Matches
+        assert best >= _enemy_score(cfg, policies.build_table(behaviour, cfg)) - 0.01
+
+
+def test_parallel_lookups_build_each_table_once(monkeypatch):
+    monkeypatch.setattr(policies, "_tables", {})
+    monkeypatch.setattr(policies, "standard_configs", lambda: [SMALL])
+    calls = []
+    build = policies.build_table
+
+    def counting_build(behaviour, cfg):
+        calls.append(behaviour)
+        time.sleep(0.05)
+        return build(behaviour, cfg)
+
+    monkeypatch.setattr(policies, "build_table", counting_build)
+    threads = [threading.Thread(target=policies.table_for, args=("optimal", SMALL)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["optimal"]
+
+
+def test_preload_skips_configs_without_table(monkeypatch):
+    huge = SMALL._replace(player_start=3000, enemy_start=45)
+    assert not policies.supported(huge)
+    monkeypatch.setattr(policies, "_tables", {})
+    monkeypatch.setattr(policies, "standard_configs", lambda: [huge, SMALL])
+    assert policies.preload() == 2
@@ -0,0 +1,104 @@
+import http.client
+import json
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import config
+import service
+
+
+def test_parse_request_defaults():
+    cfg, enemy, matches = service.parse_request({"scenario": "Szenario 3", "army": "Miliz", "shooters": 20})
+    assert cfg == config.match_config("Szenario 3", 20, config.S3_ARMIES[2])
+    assert enemy == "greedy" and matches == service.DEFAULT_MATCHES
+
+
+@pytest.mark.parametrize("body", [
+    {"player_fp": 1e20},
+    {"enemy_fp": service.MAX_FIREPOWER + 1},
+    {"cross_n": 10**12},
+    {"shooters": 51},
+    {"shooters": -1},
+    {"player_start": 100_000, "enemy_start": 100_000, "matches": 1000},
+    {"enemy": "optimal", "enemy_start": 70_000},
+    {"enemy": "cautious", "hit_chance": 0.2},
+    {"matches": 0},
+])
+def test_parse_request_rejects_out_of_range(body):
+    with pytest.raises(ValueError):
+        service.parse_request({"scenario": "Szenario 2", **body})
+
+
+def test_parse_request_rejects_infinite_numbers():
+    body = json.loads('{"scenario": "Szenario 2", "player_fp": 1e400}')
+    with pytest.raises(ValueError):
+        service.parse_request(body)
+
+
+def test_failing_config_only_fails_its_own_requests():
+    batcher = service.MicroBatcher(service.LRUCache(16))
+    good, _, _ = service.parse_request({"scenario": "Szenario 2", "matches": 50})
+    # an parse_request vorbei: sprengt int64 in den Kernen
+    bad = good._replace(player_fp=10**20)
+    futures = [Future(), Future(), Future()]
+    batcher._run([
+        ((good, "greedy"), 50, futures[0]),
+        ((bad, "greedy"), 50, futures[1]),
+        ((good, "greedy"), 20, futures[2]),
+    ])
+    assert futures[0].result(timeout=0)["matches"] == 50
+    assert futures[2].result(timeout=0) is futures[0].result(timeout=0)
+    with pytest.raises(OverflowError):
+        futures[1].result(timeout=0)
+
+
+def test_submit_answers_from_cache():
+    batcher = service.MicroBatcher(service.LRUCache(16))
+    cfg, enemy, _ = service.parse_request({"scenario": "Szenario 1"})
+    first = batcher.submit(cfg, enemy, 100).result(timeout=30)
+    assert batcher.submit(cfg, enemy, 80).result(timeout=0) is first
+
+
+def test_each_config_runs_only_its_own_match_count():
+    batcher = service.MicroBatcher(service.LRUCache(16))
+    small, _, _ = service.parse_request({"scenario": "Szenario 1", "matches": 3})
+    large, _, _ = service.parse_request({"scenario": "Szenario 2", "matches": 400})
+    futures = [Future(), Future(), Future()]
+    batcher._run([
+        ((small, "greedy"), 3, futures[0]),
+        ((large, "greedy"), 400, futures[1]),
+        ((small, "greedy"), 2, futures[2]),
+    ])
+    assert futures[0].result(timeout=0)["matches"] == 3
+    assert futures[1].result(timeout=0)["matches"] == 400
+    assert futures[2].result(timeout=0)["matches"] == 3
+
+
+@pytest.fixture
+def server():
+    service.Handler.batcher = service.MicroBatcher(service.LRUCache(16))
+    httpd = service.ThreadingHTTPServer(("127.0.0.1", 0), service.Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("length, status", [("-1", 400), ("abc", 400), (str(service.MAX_BODY_BYTES + 1), 413)])
+def test_bad_content_length_is_rejected_before_reading(server, length, status):
+    conn = http.client.HTTPConnection(*server, timeout=5)
+    conn.putrequest("POST", "/simulate")
+    conn.putheader("Content-Length", length)
+    conn.endheaders()
+    assert conn.getresponse().status == status
+    conn.close()
+
+
+def test_simulate_over_http(server):
+    conn = http.client.HTTPConnection(*server, timeout=30)
+    conn.request("POST", "/simulate", body=json.dumps({"scenario": "Szenario 2", "matches": 20}))
+    response = conn.getresponse()
+    assert response.status == 200 and json.loads(response.read())["matches"] == 20
+    conn.close()
@@ -0,0 +1,209 @@
+import numpy as np
+
+import snapshot
+import soldiers
+
+PROFILES = {
+    "Veteran": {"accuracy": 0.14, "morale": 1.0},
+    "Rekrut": {"accuracy": 0.08, "morale": 0.85},
+}
+
+
+def _state(**overrides):
+    state = {
+        "page": "game",
+        "current_scenario": "Szenario 3",
+        "games_played_s1": 2,
+        "games_played_s2": 0,
+        "games_played_s3": 1,
+        "explanation_text_s1": "Querschnitt: Trefferchance ~ exponierte Gegner / n",
+        "explanation_text_s2": "",
+        "player_name": "Zug Süd",
+        "enemy_name": "Feind",
+        "bg_file": "szenario2.png",
+        "s3_army_key": None,
+        "s3_army_soldiers": None,
+        "s3_army_firepower": None,
+        "s3_army_veterans": 0.3,
+        "s3_detailed": False,
+        "running": True,
+        "game_over": False,
+        "round": 7,
+        "player_cover": 12,
+        "player_shooters": 30,
+        "enemy_shooters": 18,
+        "winner": None,
+        "log_seq": 0,
+        "enemy_cover": 4,
+        "enemy_behaviour": "cautious",
+        "log": [],
+    }
+    state.update(overrides)
+    return state
+
+
+def _append(state, line):
+    state["log"].append(line)
+    state["log_seq"] += 1
+
+
+def test_encode_decode_roundtrip():
+    state = _state()
+    decoded = snapshot.decode(snapshot.encode(state))
+    expected = {key: state[key] for key, _ in snapshot.FIELDS}
+    expected.update(dict.fromkeys(snapshot.TEXT_FIELDS))  # Texte liegen in eigener Spalte
+    assert decoded == expected
+    assert snapshot.decode_texts(snapshot.encode_texts(state)) == {
+        key: state[key] for key in snapshot.TEXT_FIELDS
+    }
+
+
+def test_encode_truncates_on_character_boundary():
+    state = _state(explanation_text_s1="a" + "ä" * 40000)
+    decoded = snapshot.decode_texts(snapshot.encode_texts(state))
+    text = decoded["explanation_text_s1"]
+    assert text.startswith("aä") and set(text[1:]) == {"ä"}
+    assert len(text.encode()) < snapshot._NONE_STR
+
+
+def test_decode_of_older_format_leaves_new_fields_out():
+    blob = snapshot.encode(_state())
+    # älteres Format = ohne die zuletzt angehängten Felder
+    short = blob[: -(2 + len("cautious")) - 4]
+    decoded = snapshot.decode(short)
+    assert "enemy_behaviour" not in decoded and "enemy_cover" not in decoded
+    assert decoded["round"] == 7
+
+
+def test_army_bytes_roundtrip():
+    army = soldiers.build_army(25, 2, 0.4, PROFILES)
+    soldiers.deploy(army, 10)
+    soldiers.apply_hits(army, 3)
+    restored = soldiers.from_bytes(soldiers.to_bytes(army))
+    for original, copy in zip(army, restored):
+        assert original.dtype == copy.dtype
+        np.testing.assert_array_equal(original, copy)
+    restored.alive[:] = False  # eigene Kopie, nicht auf dem Blob
+    assert army.alive.any()
+
+
+def test_save_restore_only_writes_new_log_lines(tmp_path):
+    store = snapshot.SnapshotStore(str(tmp_path / "s.sqlite"))
+    state = _state()
+    snapshot.save(store, "tok", state)
+    assert store.read("tok") is None  # noch kein Match gestartet
+
+    for i in range(250):
+        _append(state, f"Runde {i}")
+        state["log"] = state["log"][-200:]
+        snapshot.save(store, "tok", state)
+    state["log"] = []  # Neustart des Matches
+    _append(state, "Start gedrückt")
+    snapshot.save(store, "tok", state)
+
+    restored = {}
+    assert snapshot.restore(store, "tok", restored)
+    assert restored["log"] == ["Start gedrückt"]
+    assert restored["round"] == 7 and restored["player_name"] == "Zug Süd"
+
+
+def test_restore_drops_values_outside_allowed_sets(tmp_path):
+    store = snapshot.SnapshotStore(str(tmp_path / "s.sqlite"))
+    state = _state(enemy_behaviour="berserk")
+    _append(state, "Start")
+    snapshot.save(store, "tok", state)
+
+    restored = {}
+    assert snapshot.restore(store, "tok", restored, {"enemy_behaviour": {"greedy", "cautious"}})
+    assert "enemy_behaviour" not in restored
+    assert restored["page"] == "game"
+
+
+def test_restore_of_corrupt_snapshot_returns_false(tmp_path):
+    store = snapshot.SnapshotStore(str(tmp_path / "s.sqlite"))
+    bad = bytes([snapshot.FORMAT_VERSION]) + b"\x03\x00\xc3\xa4\xc3"
+    store.write("tok", bad, None, [], 0)
+    restored = {}
+    assert snapshot.restore(store, "tok", restored) is False
+    assert restored == {}
+
+
+def test_prune_removes_stale_sessions(tmp_path):
+    store = snapshot.SnapshotStore(str(tmp_path / "s.sqlite"), ttl_seconds=60)
+    state = _state()
+    _append(state, "Start")
+    snapshot.save(store, "tok", state)
+    assert store.prune() == 0
+    assert store.prune(now=10**12) == 1
+    assert store.read("tok") is None
+
+
+class _CountingStore(snapshot.SnapshotStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.writes = []
+
+    def write(self, token, state_blob, armies_blob, new_lines, log_floor, texts_blob=None):
+        self.writes.append((state_blob, armies_blob, texts_blob))
+        super().write(token, state_blob, armies_blob, new_lines, log_floor, texts_blob)
+
+
+def test_texts_are_written_only_when_changed(tmp_path):
+    store = _CountingStore(str(tmp_path / "s.sqlite"))
+    state = _state(explanation_text_s1="x" * 60000)
+    for i in range(3):
+        _append(state, f"Runde {i}")
+        state["round"] = i
+        snapshot.save(store, "tok", state)
+    assert [texts is not None for _, _, texts in store.writes] == [True, False, False]
+    assert all(len(blob) < 1000 for blob, _, _ in store.writes)
+
+    state["explanation_text_s1"] = "neu"
+    snapshot.save(store, "tok", state)
+    assert store.writes[-1][2] is not None
+    restored = {}
+    assert snapshot.restore(store, "tok", restored)
+    assert restored["explanation_text_s1"] == "neu" and restored["explanation_text_s2"] == ""
+
+
+def test_running_detail_armies_are_written_at_a_lower_rate(tmp_path):
+    store = _CountingStore(str(tmp_path / "s.sqlite"))
+    player = soldiers.build_army(40, 2, 0.5, PROFILES)
+    enemy = soldiers.build_army(30, 2, 0.3, PROFILES)
+    state = _state(s3_detailed=True, s3_player_army=player, s3_enemy_army=enemy)
+    for tick in range(20):
+        soldiers.deploy(player, 20)
+        soldiers.apply_hits(enemy, 1)
+        _append(state, f"Runde {tick}")
+        snapshot.save(store, "tok", state, now=1000 + tick * 0.1)
+    army_writes = [armies for _, armies, _ in store.writes if armies is not None]
+    assert len(army_writes) == 1
+
+    state["running"] = False  # Pause: sofort aktuell
+    snapshot.save(store, "tok", state, now=1002.5)
+    restored = {}
+    assert snapshot.restore(store, "tok", restored)
+    assert soldiers.alive_count(restored["s3_enemy_army"]) == soldiers.alive_count(enemy)
+    assert restored["enemy_shooters"] + restored["enemy_cover"] == soldiers.alive_count(enemy)
+
+
+def test_restore_of_older_snapshot_keeps_texts_in_blob(tmp_path):
+    store = snapshot.SnapshotStore(str(tmp_path / "s.sqlite"))
+    state = _state()
+    _append(state, "Start")
+    # Format vor der Text-Spalte: Texte im Match-Blob
+    old_blob = snapshot.encode({**state, "explanation_text_s1": None})
+    old_blob = old_blob.replace(
+        snapshot._pack_str(None) + snapshot._pack_str(None),
+        snapshot._pack_str(state["explanation_text_s1"]) + snapshot._pack_str(""),
+        1,
+    )
+    store.write("tok", old_blob, b"", [(1, "Start")], 0)
+    restored = {}
+    assert snapshot.restore(store, "tok", restored)
+    assert restored["explanation_text_s1"] == state["explanation_text_s1"]
+
+    snapshot.save(store, "tok", restored)  # Texte wandern in die eigene Spalte
+    again = {}
+    assert snapshot.restore(store, "tok", again)
+    assert again["explanation_text_s1"] == state["explanation_text_s1"]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import soldiers
+
+PROFILES = {
+    "Veteran": {"accuracy": 0.14, "morale": 1.0},
+    "Rekrut": {"accuracy": 0.08, "morale": 0.85},
+}
+
+
+@pytest.fixture(autouse=True)
+def seeded_rng(monkeypatch):
+    monkeypatch.setattr(soldiers, "_rng", np.random.default_rng(7))
+
+
+def test_build_army_splits_veterans_and_recruits():
+    army = soldiers.build_army(10, 3, 0.3, PROFILES)
+    assert army.alive.all() and army.exposed.all()
+    assert (army.firepower == 3).all()
+    np.testing.assert_allclose(army.accuracy, [0.14] * 3 + [0.08] * 7)
+    np.testing.assert_allclose(army.morale, [1.0] * 3 + [0.85] * 7)
+    assert soldiers.build_army(-5, 1, 2.0, PROFILES).alive.size == 0
+
+
+def test_deploy_sends_best_accuracy_times_morale_first():
+    army = soldiers.build_army(6, 1, 0.5, PROFILES)
+    army.morale[0] = 0.3           # Veteran mit wenig Moral: 0.042 < 0.068
+    army.alive[1] = False          # Tote schießen nicht
+    assert soldiers.deploy(army, 2) == 2
+    # nur noch Veteran 2 ist besser als die Rekruten; bei Gleichstand der erste
+    assert np.flatnonzero(army.exposed).tolist() == [2, 3]
+    assert soldiers.deploy(army, 99) == soldiers.alive_count(army) == 5
+    assert not army.exposed[1]
+    assert soldiers.deploy(army, -1) == 0 and not army.exposed.any()
+
+
+def test_fire_only_counts_exposed_living_soldiers():
+    army = soldiers.build_army(20, 4, 1.0, PROFILES)
+    army.accuracy[:] = 1.0
+    soldiers.deploy(army, 5)
+    assert soldiers.fire(army) == 5 * 4
+    army.alive[np.flatnonzero(army.exposed)[:2]] = False
+    assert soldiers.fire(army) == 3 * 4
+    soldiers.deploy(army, 0)
+    assert soldiers.fire(army) == 0
+
+
+def test_apply_hits_kills_only_exposed_and_keeps_morale_above_floor():
+    army = soldiers.build_army(10, 1, 0.0, PROFILES)
+    soldiers.deploy(army, 4)
+    exposed = set(np.flatnonzero(army.exposed))
+    assert soldiers.apply_hits(army, 100) == 4  # mehr Treffer als Ziele
+    assert set(np.flatnonzero(~army.alive)) == exposed
+    # 4 von 10 gefallen: Moral sinkt um MORALE_SHOCK * 0.4
+    np.testing.assert_allclose(army.morale[army.alive], 0.85 - soldiers.MORALE_SHOCK * 0.4, rtol=1e-6)
+
+    for _ in range(5):
+        soldiers.deploy(army, 1)
+        soldiers.apply_hits(army, 1)
+    assert (army.morale[army.alive] >= soldiers.MORALE_FLOOR).all()
+    assert soldiers.apply_hits(army, 0) == 0
+
+
+def test_resolve_round_fires_before_casualties():
+    player = soldiers.build_army(5, 1, 1.0, PROFILES)
+    enemy = soldiers.build_army(5, 1, 1.0, PROFILES)
+    player.accuracy[:] = enemy.accuracy[:] = 1.0
+    soldiers.deploy(player, 5)
+    soldiers.deploy(enemy, 5)
+    # gleichzeitig: auch die Getroffenen schießen in dieser Runde noch zurück
+    assert soldiers.resolve_round(player, enemy) == (5, 5)
+    assert soldiers.alive_count(player) == soldiers.alive_count(enemy) == 0
+
+
+def test_seeded_rng_is_reproducible(monkeypatch):
+    results = []
+    for _ in range(2):
+        monkeypatch.setattr(soldiers, "_rng", np.random.default_rng(11))
+        player = soldiers.build_army(200, 2, 0.4, PROFILES)
+        enemy = soldiers.build_army(150, 2, 0.3, PROFILES)
+        rounds = []
+        while soldiers.alive_count(player) and soldiers.alive_count(enemy):
+            soldiers.deploy(player, 100)
+            soldiers.deploy(enemy, 150)
+            rounds.append(soldiers.resolve_round(player, enemy))
+        results.append((rounds, player.alive.copy(), enemy.morale.copy()))
+    assert results[0][0] == results[1][0]
+    np.testing.assert_array_equal(results[0][1], results[1][1])
+    np.testing.assert_array_equal(results[0][2], results[1][2])